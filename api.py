@@ -2,25 +2,72 @@
 REST API for carrier data processing and load matching.
 Provides endpoints for onboarding, matching, and data management.
 """
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, abort, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_caching import Cache
+from flask_compress import Compress
 from werkzeug.utils import secure_filename
 import os
-from typing import Dict, Any
+import shutil
+import uuid
+from typing import Dict, Any, List, Optional, Union
 from pathlib import Path
 
+import orjson
+
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.parser import ParseFailedException
+    from streaming_form_data.targets import BaseTarget, ValueTarget
+except ImportError:
+    StreamingFormDataParser = None
+    BaseTarget = object
+
 from database import Database
-from onboarding import OnboardingFlow
-from load_matching import LoadMatchingEngine
+from jobs import JobQueue
+from onboarding import OnboardingFlow, parse_files
+from load_matching import LoadMatchingEngine, loads_to_frame
 from schema import CarrierProfile, Load, DataSource
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes and decodes with orjson"""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Dataclasses, enums and datetimes are encoded natively by orjson;
+        # anything else goes through Flask's default() hook
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 30})
+
+# Compress JSON responses (large match/profile payloads); small bodies aren't worth it
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls', 'pdf'}
+_ALLOWED = frozenset(ALLOWED_EXTENSIONS)
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+UPLOAD_CHUNK_SIZE = 64 * 1024  # 64KB
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024  # 1MB
+ONBOARDING_WORKERS = int(os.getenv('ONBOARDING_WORKERS', 2))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))  # seconds
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -29,11 +76,123 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 # Initialize services
 database = Database()
 onboarding_flow = OnboardingFlow(database)
+onboarding_jobs = JobQueue(max_workers=ONBOARDING_WORKERS, result_ttl=JOB_RESULT_TTL)
 
 
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    i = filename.rfind('.')
+    return i != -1 and filename[i + 1:].lower() in _ALLOWED
+
+
+class UploadTarget(BaseTarget):
+    """Streaming target that writes every uploaded file part straight to disk"""
+    
+    def __init__(self, upload_folder: str):
+        super().__init__()
+        self.upload_folder = upload_folder
+        self.saved_files: List[str] = []
+        self.rejected_files: List[str] = []
+        self._fd = None
+    
+    def on_start(self):
+        filename = self.multipart_filename
+        if not filename:
+            return
+        # Validate the sanitized name, since that is the one written to disk
+        safe_name = secure_filename(filename)
+        if not allowed_file(safe_name):
+            self.rejected_files.append(filename)
+            return
+        
+        filepath = os.path.join(self.upload_folder, safe_name)
+        self._fd = open(filepath, 'wb')
+        self.saved_files.append(filepath)
+    
+    def on_data_received(self, chunk: bytes):
+        if self._fd:
+            self._fd.write(chunk)
+    
+    def on_finish(self):
+        if self._fd:
+            self._fd.close()
+            self._fd = None
+
+
+@app.before_request
+def stream_onboard_upload():
+    """
+    Stream multipart uploads for the onboard endpoint directly to disk.
+    
+    Runs before request.files is touched so werkzeug never buffers the
+    body. Results are stored on flask.g for the endpoint to pick up.
+    """
+    if (StreamingFormDataParser is None or request.method != 'POST' or
+            request.endpoint != 'onboard_carrier' or request.mimetype != 'multipart/form-data'):
+        return None
+    
+    staging_dir = None
+    file_target = None
+    bytes_read = 0
+    try:
+        staging_dir = _make_staging_dir()
+        file_target = UploadTarget(staging_dir)
+        carrier_name = ValueTarget()
+        carrier_mc = ValueTarget()
+        
+        parser = StreamingFormDataParser(headers=request.headers)
+        parser.register('files', file_target)
+        parser.register('carrier_name', carrier_name)
+        parser.register('carrier_mc', carrier_mc)
+        
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            bytes_read += len(chunk)
+            if bytes_read > app.config['MAX_CONTENT_LENGTH']:
+                abort(413)
+            parser.data_received(chunk)
+    except Exception as e:
+        if file_target is not None:
+            file_target.on_finish()
+        if staging_dir is not None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        # A missing boundary or malformed body is the client's error, as with werkzeug's parser
+        if isinstance(e, ParseFailedException):
+            abort(make_response(jsonify({'error': f'Malformed multipart body: {e}'}), 400))
+        raise
+    
+    g.upload = {
+        'staging_dir': staging_dir,
+        'saved_files': file_target.saved_files,
+        'rejected_files': file_target.rejected_files,
+        'carrier_name': carrier_name.value.decode('utf-8') or None,
+        'carrier_mc': carrier_mc.value.decode('utf-8') or None
+    }
+    return None
+
+
+@cache.memoize(timeout=60)
+def load_stats() -> Dict[str, int]:
+    """Load system statistics (cached)"""
+    return database.get_stats()
+
+
+@cache.memoize(timeout=30)
+def load_carrier_profile(carrier_id: str) -> Optional[Dict[str, Any]]:
+    """Load a carrier profile response body (cached; misses are not cached)"""
+    profile = database.get_carrier_profile(carrier_id)
+    if not profile:
+        return None
+    
+    # In production, use proper serialization
+    return {
+        'carrier_id': profile.carrier_id,
+        'carrier_name': profile.carrier_name,
+        'mc_number': profile.mc_number,
+        # ... add more fields
+    }
 
 
 @app.route('/health', methods=['GET'])
@@ -50,63 +209,134 @@ def onboard_carrier():
     """
     Onboard a carrier by uploading files.
     
+    Files are staged on disk and processed by a background job; poll
+    /api/v1/jobs/<job_id> for the result.
+    
     Request:
         - files: List of files (CSV, Excel, PDF)
         - carrier_name: Optional carrier name
         - carrier_mc: Optional carrier MC number
     
-    Response:
-        - carrier_id: Generated carrier ID
-        - stats: Processing statistics
-        - errors: List of errors
-        - warnings: List of warnings
+    Response (202 Accepted):
+        - job_id: Background job ID
+        - carrier_id: Carrier ID the profile will be saved under
+        - status: Job status ("queued")
     """
-    if 'files' not in request.files:
-        return jsonify({'error': 'No files provided'}), 400
-    
-    files = request.files.getlist('files')
-    if not files or files[0].filename == '':
-        return jsonify({'error': 'No files selected'}), 400
-    
-    carrier_name = request.form.get('carrier_name')
-    carrier_mc = request.form.get('carrier_mc')
-    
-    saved_files = []
-    try:
+    upload = g.get('upload')
+    if upload is not None:
+        staging_dir = upload['staging_dir']
+        saved_files = upload['saved_files']
+        if upload['rejected_files']:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return jsonify({'error': f"Invalid file type: {upload['rejected_files'][0]}"}), 400
+        if not saved_files:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return jsonify({'error': 'No files provided'}), 400
+        carrier_name = upload['carrier_name']
+        carrier_mc = upload['carrier_mc']
+    else:
+        if 'files' not in request.files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        files = request.files.getlist('files')
+        if not files or files[0].filename == '':
+            return jsonify({'error': 'No files selected'}), 400
+        
+        carrier_name = request.form.get('carrier_name')
+        carrier_mc = request.form.get('carrier_mc')
+        
+        staging_dir = _make_staging_dir()
+        saved_files = []
         # Save uploaded files
         for file in files:
-            if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
+            filename = secure_filename(file.filename) if file else ''
+            if allowed_file(filename):
+                filepath = os.path.join(staging_dir, filename)
+                with open(filepath, 'wb', buffering=UPLOAD_COPY_BUFFER_SIZE) as dst:
+                    shutil.copyfileobj(file.stream, dst, length=UPLOAD_COPY_BUFFER_SIZE)
                 saved_files.append(filepath)
             else:
+                shutil.rmtree(staging_dir, ignore_errors=True)
                 return jsonify({'error': f'Invalid file type: {file.filename}'}), 400
-        
-        # Process files
-        results = onboarding_flow.process_upload(
-            saved_files,
+    
+    carrier_id = str(uuid.uuid4())
+    job_id = onboarding_jobs.enqueue(
+        run_onboarding,
+        saved_files,
+        staging_dir,
+        carrier_id=carrier_id,
+        carrier_name=carrier_name,
+        carrier_mc=carrier_mc,
+        meta={'carrier_id': carrier_id}
+    )
+    
+    return jsonify({
+        'job_id': job_id,
+        'carrier_id': carrier_id,
+        'status': 'queued'
+    }), 202, {'Location': f'/api/v1/jobs/{job_id}'}
+
+
+def run_onboarding(file_paths: List[str], staging_dir: str, carrier_id: str,
+                   carrier_name: Optional[str] = None,
+                   carrier_mc: Optional[str] = None) -> Dict[str, Any]:
+    """Background job: parse staged files, then normalize/enrich/save the merged profile"""
+    try:
+        # Parse files in parallel worker processes
+        partials = parse_files(file_paths)
+        results = onboarding_flow.complete_upload(
+            partials,
             carrier_name=carrier_name,
-            carrier_mc=carrier_mc
+            carrier_mc=carrier_mc,
+            carrier_id=carrier_id
         )
         
-        return jsonify(results), 200
+        # New data was saved; drop cached reads that may now be stale
+        cache.delete_memoized(load_stats)
+        cache.delete_memoized(load_carrier_profile, results['carrier_id'])
         
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    
+        return results
     finally:
         # Clean up uploaded files
-        for filepath in saved_files:
-            try:
-                os.remove(filepath)
-            except:
-                pass
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _make_staging_dir() -> str:
+    """Create a private directory under the upload folder for one upload"""
+    staging_dir = os.path.join(app.config['UPLOAD_FOLDER'], uuid.uuid4().hex)
+    os.makedirs(staging_dir)
+    return staging_dir
+
+
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Get the status of a background job.
+    
+    Response:
+        - status: queued, started, finished or failed
+        - result: Onboarding results (when finished)
+        - error: Error message (when failed)
+    """
+    job = onboarding_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job not found: {job_id}'}), 404
+    return jsonify(job), 200
 
 
 @app.route('/api/v1/carrier/<carrier_id>/status', methods=['GET'])
 def get_carrier_status(carrier_id: str):
     """Get onboarding status for a carrier"""
+    # Report the background job while the upload is still being processed
+    job = onboarding_jobs.find(carrier_id=carrier_id)
+    if job is not None and job['status'] != 'finished':
+        return jsonify({
+            'status': 'processing' if job['status'] != 'failed' else 'failed',
+            'job_id': job['job_id'],
+            'job_status': job['status'],
+            'error': job['error']
+        }), 200
+    
     try:
         status = onboarding_flow.get_onboarding_status(carrier_id)
         return jsonify(status), 200
@@ -120,7 +350,7 @@ def get_load_matches(carrier_id: str):
     Get load matches for a carrier.
     
     Request body:
-        - loads: List of available loads (JSON)
+        - loads: List of available loads (JSON, Load.to_dict() shape)
         - limit: Maximum number of matches (default: 10)
     
     Response:
@@ -132,20 +362,10 @@ def get_load_matches(carrier_id: str):
         loads_data = data.get('loads', [])
         limit = data.get('limit', 10)
         
-        # Convert load data to Load objects
-        # This is simplified - in production, use proper deserialization
-        available_loads = []
-        for load_data in loads_data:
-            # Create Load object from data
-            # Note: This is a simplified version
-            load = Load(
-                load_id=load_data.get('load_id'),
-                source=DataSource.MANUAL
-            )
-            available_loads.append(load)
-        
-        # Generate matches
-        results = onboarding_flow.generate_matches(carrier_id, available_loads, limit)
+        # Deserialize all loads into one DataFrame; Load objects are only
+        # built for the returned matches
+        loads_df = loads_to_frame(loads_data)
+        results = onboarding_flow.generate_matches_from_df(carrier_id, loads_df, limit)
         
         return jsonify(results), 200
         
@@ -157,18 +377,11 @@ def get_load_matches(carrier_id: str):
 def get_carrier_profile(carrier_id: str):
     """Get carrier profile"""
     try:
-        profile = database.get_carrier_profile(carrier_id)
+        profile = load_carrier_profile(carrier_id)
         if not profile:
             return jsonify({'error': 'Carrier not found'}), 404
         
-        # Convert to dict
-        # In production, use proper serialization
-        return jsonify({
-            'carrier_id': profile.carrier_id,
-            'carrier_name': profile.carrier_name,
-            'mc_number': profile.mc_number,
-            # ... add more fields
-        }), 200
+        return jsonify(profile), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -178,13 +391,8 @@ def get_carrier_profile(carrier_id: str):
 def get_stats():
     """Get system statistics"""
     try:
-        # In production, query database for real stats
-        return jsonify({
-            'total_carriers': 0,
-            'total_loads': 0,
-            'total_brokers': 0,
-            'total_lanes': 0
-        }), 200
+        stats = load_stats()
+        return jsonify(stats), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
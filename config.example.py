@@ -6,6 +6,9 @@ import os
 
 # Database Configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///carrier_data.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))  # ignored for SQLite
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 40))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds
 
 # API Configuration
 API_HOST = os.getenv('API_HOST', '0.0.0.0')
@@ -2,18 +2,91 @@
 Database models and integration using SQLAlchemy.
 Supports both SQLite (development) and PostgreSQL (production).
 """
-from sqlalchemy import create_engine, Column, String, Float, Integer, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import create_engine, event, select, func, tuple_, Column, String, Float, Integer, DateTime, Text, JSON, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, selectinload
+from sqlalchemy.pool import StaticPool
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Dict, Any, Iterator
+import ast
+import hashlib
 import os
 from enum import Enum
 
+import orjson
+from alembic import command
+from alembic.config import Config
+
 from schema import DataSource, EnrichmentSource
 
 Base = declarative_base()
 
+# Rows per INSERT statement; keeps bound parameters under SQLite's limit
+UPSERT_BATCH_SIZE = 500
+
+# Alembic migrations (alembic.ini and migrations/ next to this module)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Connection pool settings (server databases only; see Database._get_engine)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 40))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds
+
+
+def _json_dumps(value: Any) -> str:
+    """Serialize JSON columns with orjson"""
+    return orjson.dumps(value).decode('utf-8')
+
+
+def _json_loads(value: str) -> Any:
+    """
+    Deserialize JSON columns with orjson.
+    
+    Rows written before these columns were JSON hold str(dict) / str(list)
+    text (rewritten by the JSON columns migration); those are read as
+    Python literals, or returned as the raw text.
+    """
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            return value
+
+
+def upgrade_schema(engine):
+    """Apply pending Alembic migrations to the database behind engine"""
+    config = Config()
+    config.set_main_option('script_location', MIGRATIONS_DIR)
+    with engine.begin() as connection:
+        config.attributes['connection'] = connection
+        command.upgrade(config, 'head')
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so readers don't block on writers, and tune caching per connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")  # 64MB
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
+    finally:
+        cursor.close()
+
+
+def stable_id(value: str) -> str:
+    """
+    Deterministic short ID for a string.
+    
+    Unlike hash(), the result does not change between processes
+    (PYTHONHASHSEED), so re-saving the same data maps to the same rows.
+    """
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
 
 class BrokerModel(Base):
     """Database model for brokers"""
@@ -25,7 +98,7 @@ class BrokerModel(Base):
     mc_id = Column(String, index=True)
     broker_phone_number = Column(String)
     broker_email = Column(String)
-    company_address = Column(Text)  # JSON string
+    company_address = Column(JSON(none_as_null=True))
     date_of_contract = Column(DateTime)
     load_board = Column(String)
     notes = Column(Text)
@@ -41,10 +114,10 @@ class LaneModel(Base):
     __tablename__ = 'lanes'
     
     lane_id = Column(String, primary_key=True)
-    origin_city_state = Column(String, index=True)
+    origin_city_state = Column(String)  # leading column of ix_lane_od
     destination_city_state = Column(String, index=True)
-    origin_address = Column(Text)  # JSON string
-    destination_address = Column(Text)  # JSON string
+    origin_address = Column(JSON(none_as_null=True))
+    destination_address = Column(JSON(none_as_null=True))
     distance_miles = Column(Float)
     estimated_duration_hours = Column(Float)
     source = Column(SQLEnum(DataSource))
@@ -52,6 +125,10 @@ class LaneModel(Base):
     
     loads = relationship("LoadModel", back_populates="lane")
     enriched_data = relationship("EnrichedDataModel", back_populates="lane")
+    
+    __table_args__ = (
+        Index('ix_lane_od', 'origin_city_state', 'destination_city_state'),
+    )
 
 
 class LoadModel(Base):
@@ -59,6 +136,7 @@ class LoadModel(Base):
     __tablename__ = 'loads'
     
     load_id = Column(String, primary_key=True)
+    carrier_id = Column(String, ForeignKey('carrier_profiles.carrier_id'), index=True)
     broker_id = Column(String, ForeignKey('brokers.broker_id'))
     lane_id = Column(String, ForeignKey('lanes.lane_id'))
     
@@ -76,13 +154,18 @@ class LoadModel(Base):
     load_board = Column(String)
     
     source = Column(SQLEnum(DataSource))
-    raw_data = Column(Text)  # JSON string
+    raw_data = Column(JSON(none_as_null=True))
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
+    carrier = relationship("CarrierProfileModel", back_populates="loads")
     broker = relationship("BrokerModel", back_populates="loads")
     lane = relationship("LaneModel", back_populates="loads")
     rate = relationship("RateModel", back_populates="load", uselist=False)
+    
+    __table_args__ = (
+        Index('ix_load_broker_equip', 'broker_id', 'equipment_type'),
+    )
 
 
 class RateModel(Base):
@@ -111,7 +194,7 @@ class EnrichedDataModel(Base):
     enriched_id = Column(String, primary_key=True)
     lane_id = Column(String, ForeignKey('lanes.lane_id'))
     
-    origin_city_state = Column(String, index=True)
+    origin_city_state = Column(String)  # leading column of ix_enriched_od
     destination_city_state = Column(String, index=True)
     
     average_rate = Column(Float)
@@ -128,6 +211,10 @@ class EnrichedDataModel(Base):
     last_updated = Column(DateTime, default=datetime.now)
     
     lane = relationship("LaneModel", back_populates="enriched_data")
+    
+    __table_args__ = (
+        Index('ix_enriched_od', 'origin_city_state', 'destination_city_state', unique=True),
+    )
 
 
 class CarrierProfileModel(Base):
@@ -138,17 +225,27 @@ class CarrierProfileModel(Base):
     carrier_name = Column(String)
     mc_number = Column(String, index=True)
     
-    preferred_lanes = Column(Text)  # JSON array
-    preferred_equipment = Column(Text)  # JSON array
-    preferred_brokers = Column(Text)  # JSON array
+    preferred_lanes = Column(JSON)  # JSON array
+    preferred_equipment = Column(JSON)  # JSON array
+    preferred_brokers = Column(JSON)  # JSON array
     
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    loads = relationship("LoadModel", back_populates="carrier")
+    # Brokers and lanes are linked to a carrier through its loads (sets, since
+    # many loads share a broker or lane)
+    brokers = relationship("BrokerModel", secondary="loads", viewonly=True, collection_class=set)
+    lanes = relationship("LaneModel", secondary="loads", viewonly=True, collection_class=set)
 
 
 class Database:
     """Database connection and operations"""
     
+    # Engines are shared across Database instances so the connection pool and
+    # compiled statement cache are reused (keyed by database URL)
+    _engines = {}
+    
     def __init__(self, database_url: Optional[str] = None):
         """
         Initialize database connection.
@@ -160,134 +257,315 @@ class Database:
             # Default to SQLite for development
             database_url = os.getenv('DATABASE_URL', 'sqlite:///carrier_data.db')
         
-        self.engine = create_engine(database_url, echo=False)
+        self.engine = self._get_engine(database_url)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+    
+    @classmethod
+    def _get_engine(cls, database_url: str):
+        """Get the shared engine for a database URL, creating it on first use"""
+        engine = cls._engines.get(database_url)
+        if engine is None:
+            engine = create_engine(
+                database_url,
+                echo=False,
+                query_cache_size=1200,
+                pool_pre_ping=True,
+                json_serializer=_json_dumps,
+                json_deserializer=_json_loads,
+                **cls._pool_options(database_url)
+            )
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _set_sqlite_pragmas)
+            
+            # Create tables, then migrate ones created by earlier versions
+            Base.metadata.create_all(bind=engine)
+            upgrade_schema(engine)
+            cls._engines[database_url] = engine
+        return engine
+    
+    @staticmethod
+    def _pool_options(database_url: str) -> Dict[str, Any]:
+        """Pool arguments for create_engine based on the database backend"""
+        if database_url.startswith('sqlite'):
+            # API handlers run in worker threads, so connections must be shareable
+            options: Dict[str, Any] = {'connect_args': {'check_same_thread': False}}
+            if ':memory:' in database_url or database_url.rstrip('/') == 'sqlite:':
+                # An in-memory database only exists on its one connection
+                options['poolclass'] = StaticPool
+            return options
         
-        # Create tables
-        Base.metadata.create_all(bind=self.engine)
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_recycle': DB_POOL_RECYCLE
+        }
     
     def get_session(self):
         """Get database session"""
         return self.SessionLocal()
     
+    @contextmanager
+    def session_scope(self) -> Iterator[Any]:
+        """Session for a unit of work: commits on success, rolls back on error"""
+        session = self.get_session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
     def save_carrier_profile(self, profile, carrier_id: str):
         """Save carrier profile to database"""
         session = self.get_session()
         try:
-            # Save carrier profile
-            carrier_model = CarrierProfileModel(
-                carrier_id=carrier_id,
-                carrier_name=profile.carrier_name,
-                mc_number=profile.mc_number,
-                preferred_lanes=str(profile.preferred_lanes),
-                preferred_equipment=str(profile.preferred_equipment),
-                preferred_brokers=str(profile.preferred_brokers)
-            )
-            session.merge(carrier_model)
-            
-            # Save brokers
-            seen_broker_ids = set()
-            for broker in profile.brokers:
-                # Generate unique broker_id
-                if broker.broker_id:
-                    broker_id = broker.broker_id
-                elif broker.mc_id:
-                    broker_id = f"broker_{broker.mc_id}"
-                elif broker.company_name:
-                    # Use hash of company name to ensure uniqueness
-                    broker_id = f"broker_{abs(hash(broker.company_name))}"
-                else:
-                    # Fallback: use hash of all available data
-                    broker_data = f"{broker.broker_name}_{broker.broker_email}"
-                    broker_id = f"broker_{abs(hash(broker_data))}"
+            with session.begin():
+                # Save carrier profile
+                self.upsert(session, CarrierProfileModel, [{
+                    'carrier_id': carrier_id,
+                    'carrier_name': profile.carrier_name,
+                    'mc_number': profile.mc_number,
+                    'preferred_lanes': profile.preferred_lanes,
+                    'preferred_equipment': profile.preferred_equipment,
+                    'preferred_brokers': profile.preferred_brokers
+                }])
                 
-                # Ensure uniqueness within this batch
-                original_id = broker_id
-                counter = 1
-                while broker_id in seen_broker_ids:
-                    broker_id = f"{original_id}_{counter}"
-                    counter += 1
-                seen_broker_ids.add(broker_id)
+                # Rows are keyed by primary key so later duplicates win, as with merge
+                # (brokers instead merge field by field; see below)
+                broker_rows = {}
+                broker_ids_by_mc = {}  # loads reference brokers by MC number
+                lane_rows = {}
+                load_rows = {}
+                rate_rows = {}
                 
-                broker_model = BrokerModel(
-                    broker_id=broker_id,
-                    broker_name=broker.broker_name,
-                    company_name=broker.company_name,
-                    mc_id=broker.mc_id,
-                    broker_phone_number=broker.broker_phone_number,
-                    broker_email=broker.broker_email,
-                    company_address=str(broker.company_address.to_dict()) if broker.company_address else None,
-                    date_of_contract=broker.date_of_contract,
-                    load_board=broker.load_board,
-                    notes=broker.notes,
-                    source=broker.source
-                )
-                session.merge(broker_model)
-            
-            # Save lanes
-            for lane in profile.lanes:
-                lane_model = LaneModel(
-                    lane_id=lane.lane_id or f"lane_{hash(f'{lane.origin_city_state}→{lane.destination_city_state}')}",
-                    origin_city_state=lane.origin_city_state,
-                    destination_city_state=lane.destination_city_state,
-                    origin_address=str(lane.origin.to_dict()) if lane.origin else None,
-                    destination_address=str(lane.destination.to_dict()) if lane.destination else None,
-                    distance_miles=lane.distance_miles,
-                    estimated_duration_hours=lane.estimated_duration_hours,
-                    source=lane.source
-                )
-                session.merge(lane_model)
-            
-            # Save loads
-            for load in profile.loads:
-                load_model = LoadModel(
-                    load_id=load.load_id,
-                    broker_id=load.broker_id,
-                    lane_id=load.lane.lane_id if load.lane else None,
-                    pickup_date=load.pickup_date,
-                    delivery_date=load.delivery_date,
-                    equipment_type=load.equipment_type,
-                    weight=load.weight,
-                    pallets=load.pallets,
-                    pieces=load.pieces,
-                    status=load.status,
-                    booking_date=load.booking_date,
-                    notes=load.notes,
-                    load_board=load.load_board,
-                    source=load.source,
-                    raw_data=str(load.raw_data) if load.raw_data else None
-                )
-                session.merge(load_model)
+                # Save brokers
+                for broker in profile.brokers:
+                    # Deterministic broker_id; repeats of the same broker map to
+                    # the same key and are merged by the upsert
+                    if broker.broker_id:
+                        broker_id = broker.broker_id
+                    elif broker.mc_id:
+                        broker_id = f"broker_{broker.mc_id}"
+                    else:
+                        broker_data = f"{broker.company_name}|{broker.broker_email}|{broker.broker_name}"
+                        broker_id = f"broker_{stable_id(broker_data)}"
+                    
+                    if broker.mc_id:
+                        broker_ids_by_mc.setdefault(broker.mc_id, broker_id)
+                    
+                    row = {
+                        'broker_id': broker_id,
+                        'broker_name': broker.broker_name,
+                        'company_name': broker.company_name,
+                        'mc_id': broker.mc_id,
+                        'broker_phone_number': broker.broker_phone_number,
+                        'broker_email': broker.broker_email,
+                        'company_address': broker.company_address.to_dict() if broker.company_address else None,
+                        'date_of_contract': broker.date_of_contract,
+                        'load_board': broker.load_board,
+                        'notes': broker.notes,
+                        'source': broker.source
+                    }
+                    # A repeat of a broker only fills in what it knows, so a
+                    # sparse later row doesn't blank out an earlier one
+                    existing = broker_rows.get(broker_id)
+                    if existing is None:
+                        broker_rows[broker_id] = row
+                    else:
+                        existing.update((key, value) for key, value in row.items() if value is not None)
                 
-                # Save rate
-                if load.rate:
-                    rate_model = RateModel(
-                        rate_id=load.rate.rate_id or f"rate_{load.load_id}",
-                        load_id=load.load_id,
-                        rate_amount=load.rate.rate_amount,
-                        rate_per_mile=load.rate.rate_per_mile,
-                        currency=load.rate.currency,
-                        rate_type=load.rate.rate_type,
-                        source=load.rate.source,
-                        enrichment_source=load.rate.enrichment_source
-                    )
-                    session.merge(rate_model)
-            
-            session.commit()
-        except Exception as e:
-            session.rollback()
-            raise e
+                # Save lanes
+                for lane in profile.lanes:
+                    lane_id = self._lane_id(lane)
+                    lane_rows[lane_id] = {
+                        'lane_id': lane_id,
+                        'origin_city_state': lane.origin_city_state,
+                        'destination_city_state': lane.destination_city_state,
+                        'origin_address': lane.origin.to_dict() if lane.origin else None,
+                        'destination_address': lane.destination.to_dict() if lane.destination else None,
+                        'distance_miles': lane.distance_miles,
+                        'estimated_duration_hours': lane.estimated_duration_hours,
+                        'source': lane.source
+                    }
+                
+                # Save loads
+                for load in profile.loads:
+                    load_rows[load.load_id] = {
+                        'load_id': load.load_id,
+                        'carrier_id': carrier_id,
+                        'broker_id': broker_ids_by_mc.get(load.broker_id, load.broker_id),
+                        'lane_id': self._lane_id(load.lane) if load.lane else None,
+                        'pickup_date': load.pickup_date,
+                        'delivery_date': load.delivery_date,
+                        'equipment_type': load.equipment_type,
+                        'weight': load.weight,
+                        'pallets': load.pallets,
+                        'pieces': load.pieces,
+                        'status': load.status,
+                        'booking_date': load.booking_date,
+                        'notes': load.notes,
+                        'load_board': load.load_board,
+                        'source': load.source,
+                        'raw_data': load.raw_data or None
+                    }
+                    
+                    # Save rate
+                    if load.rate:
+                        rate_id = load.rate.rate_id or f"rate_{load.load_id}"
+                        rate_rows[rate_id] = {
+                            'rate_id': rate_id,
+                            'load_id': load.load_id,
+                            'rate_amount': load.rate.rate_amount,
+                            'rate_per_mile': load.rate.rate_per_mile,
+                            'currency': load.rate.currency,
+                            'rate_type': load.rate.rate_type,
+                            'source': load.rate.source,
+                            'enrichment_source': load.rate.enrichment_source
+                        }
+                
+                self.upsert(session, BrokerModel, list(broker_rows.values()), keep_existing=True)
+                self.upsert(session, LaneModel, list(lane_rows.values()))
+                self.upsert(session, LoadModel, list(load_rows.values()))
+                self.upsert(session, RateModel, list(rate_rows.values()))
         finally:
             session.close()
     
+    @staticmethod
+    def _lane_id(lane) -> str:
+        """Primary key for a lane, derived from its endpoints when not set"""
+        return lane.lane_id or f"lane_{stable_id(f'{lane.origin_city_state}→{lane.destination_city_state}')}"
+    
+    def upsert(self, session, model, rows: List[Dict[str, Any]],
+               conflict_columns: Optional[List[str]] = None,
+               keep_existing: bool = False):
+        """
+        Insert rows, updating existing ones on primary key conflict.
+        
+        Uses a native INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL,
+        batched to stay under the bound parameter limit. Other dialects fall
+        back to _bulk_upsert.
+        
+        Args:
+            session: Active database session
+            model: Model class the rows belong to
+            rows: List of column-name to value mappings (same keys in every row)
+            conflict_columns: Unique columns identifying a row (default: primary key).
+                Existing rows keep their primary key.
+            keep_existing: On update, keep a stored value where the new row has None
+        """
+        if not rows:
+            return
+        
+        dialect = self.engine.dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            self._bulk_upsert(session, model, rows, conflict_columns, keep_existing)
+            return
+        
+        conflict_columns = conflict_columns or [column.name for column in model.__table__.primary_key.columns]
+        # Provided columns plus onupdate ones (updated_at); created_at is kept
+        update_columns = [
+            column.name for column in model.__table__.columns
+            if not column.primary_key and column.name not in conflict_columns
+            and (column.name in rows[0] or column.onupdate is not None)
+        ]
+        
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = insert(model).values(rows[start:start + UPSERT_BATCH_SIZE])
+            set_ = {key: stmt.excluded[key] for key in update_columns}
+            if keep_existing:
+                set_ = {
+                    key: func.coalesce(value, model.__table__.c[key]) if key in rows[0] else value
+                    for key, value in set_.items()
+                }
+            stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_)
+            session.execute(stmt)
+    
+    def _bulk_upsert(self, session, model, rows: List[Dict[str, Any]],
+                     conflict_columns: Optional[List[str]] = None,
+                     keep_existing: bool = False):
+        """
+        Portable upsert: split rows into inserts and updates with one
+        SELECT ... IN per batch, then write each group with bulk mappings.
+        
+        Assumes a single-column primary key (true for every model here).
+        """
+        primary_key = model.__table__.primary_key.columns.values()[0]
+        key_columns = [model.__table__.c[name] for name in conflict_columns or [primary_key.name]]
+        lookup = tuple_(*key_columns) if len(key_columns) > 1 else key_columns[0]
+        onupdate_columns = [column.name for column in model.__table__.columns
+                            if column.onupdate is not None and column.name not in rows[0]]
+        
+        def row_key(row):
+            return tuple(row[column.name] for column in key_columns)
+        
+        with session.no_autoflush:
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                batch = rows[start:start + UPSERT_BATCH_SIZE]
+                keys = [row_key(row) if len(key_columns) > 1 else row_key(row)[0] for row in batch]
+                # Conflict key -> primary key of the existing row
+                existing = {
+                    tuple(found[:-1]): found[-1]
+                    for found in session.execute(select(*key_columns, primary_key).where(lookup.in_(keys)))
+                }
+                
+                to_insert = [row for row in batch if row_key(row) not in existing]
+                to_update = [{**row, primary_key.name: existing[row_key(row)]}
+                             for row in batch if row_key(row) in existing]
+                if keep_existing:
+                    # Unset columns are left out of the UPDATE
+                    to_update = [{key: value for key, value in row.items() if value is not None}
+                                 for row in to_update]
+                if onupdate_columns:
+                    now = datetime.now()
+                    to_update = [{**row, **{name: now for name in onupdate_columns}} for row in to_update]
+                
+                if to_insert:
+                    session.bulk_insert_mappings(model, to_insert)
+                if to_update:
+                    session.bulk_update_mappings(model, to_update)
+    
     def get_carrier_profile(self, carrier_id: str):
         """Retrieve carrier profile from database"""
         session = self.get_session()
         try:
             # This is a simplified version - full implementation would reconstruct
-            # all related objects from the database
-            carrier = session.query(CarrierProfileModel).filter_by(carrier_id=carrier_id).first()
+            # all related objects from the database.
+            # Relationships are loaded up front (one SELECT ... IN per relationship)
+            # so the detached result can be traversed without lazy loads.
+            carrier = (
+                session.query(CarrierProfileModel)
+                .options(
+                    selectinload(CarrierProfileModel.loads).selectinload(LoadModel.rate),
+                    selectinload(CarrierProfileModel.loads).selectinload(LoadModel.broker),
+                    selectinload(CarrierProfileModel.loads).selectinload(LoadModel.lane),
+                    selectinload(CarrierProfileModel.brokers),
+                    selectinload(CarrierProfileModel.lanes)
+                )
+                .filter_by(carrier_id=carrier_id)
+                .first()
+            )
             return carrier
         finally:
             session.close()
-
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Count stored carriers, loads, brokers and lanes"""
+        session = self.get_session()
+        try:
+            counts = {}
+            for key, model in (
+                ('total_carriers', CarrierProfileModel),
+                ('total_loads', LoadModel),
+                ('total_brokers', BrokerModel),
+                ('total_lanes', LaneModel)
+            ):
+                counts[key] = session.execute(select(func.count()).select_from(model)).scalar_one()
+            return counts
+        finally:
+            session.close()
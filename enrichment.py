@@ -2,62 +2,224 @@
 Freight market enrichment framework.
 Fills gaps in carrier data with market benchmarks and estimates.
 """
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+from typing import List, Optional, Dict, Any, Iterable, Iterator
 from datetime import datetime
-import random
+import logging
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select, tuple_
 
 from schema import (
-    Lane, Rate, EnrichedData, EnrichmentSource
+    Lane, Rate, EnrichedData, EnrichmentSource, DataSource
 )
-from database import Database, EnrichedDataModel
+from database import Database, EnrichedDataModel, stable_id, UPSERT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Lane pairs kept in EnrichmentEngine's in-process cache (oldest evicted first)
+ENRICHMENT_CACHE_SIZE = 4096
+
+# External source circuit breaker: trip after this many consecutive failures
+# within the window, then allow one probe call per reset timeout (seconds)
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_FAILURE_WINDOW = 60.0
+BREAKER_RESET_TIMEOUT = 30.0
+
+# Concurrent external source lookups (one pool per engine), and the timeout
+# (seconds) each source request is made with; a lane whose lookups time out
+# or fail is estimated instead
+EXTERNAL_ENRICHMENT_WORKERS = 16
+EXTERNAL_REQUEST_TIMEOUT = 5.0
+
+# Loads per enrich_lanes batch in iter_filled_rates
+FILL_RATES_CHUNK_SIZE = 1000
+
+
+def _optional(value: float) -> Optional[float]:
+    """Convert a NumPy value to float, mapping NaN to None"""
+    return None if np.isnan(value) else float(value)
+
+
+class CircuitState:
+    """
+    Circuit breaker state for one external enrichment source.
+    
+    Closed: calls allowed. Open: calls skipped until reset_timeout passes,
+    then a single half-open probe decides whether to close or reopen.
+    """
+    
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 failure_window: float = BREAKER_FAILURE_WINDOW,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.last_failure: Optional[float] = None
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+    
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._probing = True  # Half-open: let one probe through
+                return True
+            return False
+    
+    def on_success(self):
+        with self._lock:
+            self.failures = 0
+            self.last_failure = None
+            self.opened_at = None
+            self._probing = False
+    
+    def on_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.last_failure is not None and now - self.last_failure > self.failure_window:
+                self.failures = 0
+            self.failures += 1
+            self.last_failure = now
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = now
+                self._probing = False
 
 
 class EnrichmentEngine:
     """Engine for enriching carrier data with freight market information"""
     
-    def __init__(self, database: Optional[Database] = None):
+    def __init__(self, database: Optional[Database] = None, seed: Optional[int] = None):
         self.database = database
         # In production, these would connect to real APIs
         self.dat_available = False
         self.truckstop_available = False
         self.fmcsa_available = False
+        self._breakers = {
+            'dat': CircuitState(),
+            'truckstop': CircuitState(),
+            'fmcsa': CircuitState()
+        }
+        # One generator for estimate variation; pass seed for reproducible estimates
+        self._rng = np.random.default_rng(seed)
+        # Long-lived pool for concurrent external lookups (threads start on first use)
+        self._external_executor = ThreadPoolExecutor(max_workers=EXTERNAL_ENRICHMENT_WORKERS,
+                                                     thread_name_prefix='enrich')
+        # (origin, destination) -> EnrichedData, so hot lanes skip the database.
+        # Shared by the JobQueue worker threads, so only touched under the lock
+        self._enrichment_cache: Dict[tuple, EnrichedData] = {}
+        self._cache_lock = threading.Lock()
     
-    def enrich_lane(self, lane: Lane) -> EnrichedData:
+    def enrich_lane(self, lane: Lane, session=None, now: Optional[datetime] = None) -> EnrichedData:
         """
         Enrich a lane with market data.
         
         Args:
             lane: Lane to enrich
+            session: Optional open database session to reuse
+            now: Optional timestamp for estimates (shared across a batch)
             
         Returns:
             EnrichedData with market benchmarks
         """
-        # Check database for existing enriched data
-        if self.database:
-            existing = self._get_existing_enrichment(lane)
-            if existing:
-                return existing
+        key = (lane.origin_city_state, lane.destination_city_state)
+        if self._has_pair(lane):
+            cached = self._cached_enrichment(key)
+            if cached is not None:
+                return cached
+        
+        if self.database and session is None:
+            with self.database.session_scope() as session:
+                return self.enrich_lane(lane, session, now)
         
-        # Try to get data from external sources (in order of preference)
-        enriched = None
+        # Check database for existing enriched data
+        enriched = self._get_existing_enrichment(lane, session) if self.database else None
+        if not enriched:
+            enriched = self._enrich_from_sources(lane, now)
+            
+            # Save to database
+            if self.database and enriched:
+                self._save_enrichment(enriched, lane, session)
         
-        if self.dat_available:
-            enriched = self._enrich_from_dat(lane)
-        elif self.truckstop_available:
-            enriched = self._enrich_from_truckstop(lane)
-        elif self.fmcsa_available:
-            enriched = self._enrich_from_fmcsa(lane)
+        if self._has_pair(lane):
+            self._cache_enrichment(key, enriched)
+        return enriched
+    
+    def _enrich_from_sources(self, lane: Lane, now: Optional[datetime] = None) -> EnrichedData:
+        """Get enrichment from external sources, falling back to an estimate"""
+        enriched = self._enrich_from_external(lane)
         
         # Fallback to estimated data
         if not enriched:
-            enriched = self._estimate_enrichment(lane)
-        
-        # Save to database
-        if self.database and enriched:
-            self._save_enrichment(enriched, lane)
+            enriched = self._estimate_enrichment(lane, now)
         
         return enriched
     
+    def _enrich_from_sources_bulk(self, lanes: List[Lane]) -> List[EnrichedData]:
+        """Like _enrich_from_sources for many lanes; estimates are computed in one batch"""
+        if self.dat_available or self.truckstop_available or self.fmcsa_available:
+            results = self._enrich_from_external_many(lanes)
+        else:
+            results = [None] * len(lanes)
+        
+        # Fallback to estimated data
+        to_estimate = [i for i, enriched in enumerate(results) if not enriched]
+        estimates = self._estimate_enrichment_bulk([lanes[i] for i in to_estimate])
+        for i, enriched in zip(to_estimate, estimates):
+            results[i] = enriched
+        
+        return results
+    
+    def _enrich_from_external_many(self, lanes: List[Lane]) -> List[Optional[EnrichedData]]:
+        """
+        Run _enrich_from_external for many lanes concurrently (None on error).
+        
+        Every source request carries EXTERNAL_REQUEST_TIMEOUT, so each lookup
+        is bounded without abandoning threads mid-call.
+        """
+        if len(lanes) <= 1:
+            return [self._enrich_from_external(lane) for lane in lanes]
+        
+        futures = [self._external_executor.submit(self._enrich_from_external, lane) for lane in lanes]
+        return [None if future.exception() else future.result() for future in futures]
+    
+    def _enrich_from_external(self, lane: Lane) -> Optional[EnrichedData]:
+        """Get enrichment from the first external source that returns data"""
+        # Try external sources in order of preference, skipping tripped breakers
+        sources = (
+            ('dat', self.dat_available, self._enrich_from_dat),
+            ('truckstop', self.truckstop_available, self._enrich_from_truckstop),
+            ('fmcsa', self.fmcsa_available, self._enrich_from_fmcsa)
+        )
+        for name, available, fetch in sources:
+            breaker = self._breakers[name]
+            if not available or not breaker.allow():
+                continue
+            try:
+                enriched = fetch(lane, timeout=EXTERNAL_REQUEST_TIMEOUT)
+            except Exception as e:
+                breaker.on_failure()
+                if breaker.is_open:
+                    print(f"Warning: {name} enrichment unavailable, skipping for now: {e}")
+                continue
+            breaker.on_success()
+            if enriched:
+                return enriched
+        
+        return None
+    
     def enrich_rate(self, rate: Rate, lane: Optional[Lane] = None) -> Rate:
         """
         Enrich a rate with missing information.
@@ -84,64 +246,159 @@ class EnrichmentEngine:
         return rate
     
     def enrich_lanes(self, lanes: List[Lane]) -> List[EnrichedData]:
-        """Enrich multiple lanes"""
-        enriched_list = []
+        """
+        Enrich multiple lanes.
+        
+        Existing enrichment for all lanes is fetched in one query and new
+        enrichment is written in one bulk upsert, instead of a lookup and a
+        save per lane as in enrich_lane.
+        """
+        # Pairs already in the in-process cache skip the database lookup
+        existing = {}
+        uncached = []
         for lane in lanes:
-            enriched = self.enrich_lane(lane)
-            if enriched:
-                enriched_list.append(enriched)
-        return enriched_list
+            key = (lane.origin_city_state, lane.destination_city_state)
+            cached = self._cached_enrichment(key) if self._has_pair(lane) else None
+            if cached is not None:
+                existing[key] = cached
+            else:
+                uncached.append(lane)
+        
+        with self._session_scope() as session:
+            if self.database:
+                existing.update(self._get_existing_enrichments_bulk(uncached, session))
+            
+            # Lanes needing new enrichment: one per unseen (origin, destination)
+            # pair, as later lanes on a pair would have found it in the database
+            # when saved one at a time; lanes without a full pair each get their own
+            missing = []
+            pending = set(existing)
+            for lane in lanes:
+                key = (lane.origin_city_state, lane.destination_city_state)
+                if not self._has_pair(lane):
+                    missing.append(lane)
+                elif key not in pending:
+                    pending.add(key)
+                    missing.append(lane)
+            
+            fresh = {}
+            new_enrichments = []
+            for lane, enriched in zip(missing, self._enrich_from_sources_bulk(missing)):
+                if self._has_pair(lane):
+                    existing[(lane.origin_city_state, lane.destination_city_state)] = enriched
+                    new_enrichments.append((enriched, lane))
+                else:
+                    fresh[id(lane)] = enriched
+            
+            if self.database and new_enrichments:
+                self._save_enrichments_bulk(new_enrichments, session)
+        
+        for key, enriched in existing.items():
+            self._cache_enrichment(key, enriched)
+        
+        return [
+            existing[(lane.origin_city_state, lane.destination_city_state)]
+            if self._has_pair(lane) else fresh[id(lane)]
+            for lane in lanes
+        ]
+    
+    def _cached_enrichment(self, key: tuple) -> Optional[EnrichedData]:
+        """Cached enrichment for a lane pair, or None"""
+        with self._cache_lock:
+            return self._enrichment_cache.get(key)
+    
+    def _cache_enrichment(self, key: tuple, enriched: EnrichedData):
+        """Remember enrichment for a lane pair, evicting the oldest entry when full"""
+        with self._cache_lock:
+            cache = self._enrichment_cache
+            if key not in cache and len(cache) >= ENRICHMENT_CACHE_SIZE:
+                cache.pop(next(iter(cache)), None)
+            cache[key] = enriched
+    
+    @staticmethod
+    def _has_pair(lane: Lane) -> bool:
+        """Whether a lane has both endpoints (needed to look up or store enrichment)"""
+        return bool(lane.origin_city_state and lane.destination_city_state)
+    
+    def _session_scope(self):
+        """One session for a batch of enrichment work (no-op without a database)"""
+        return self.database.session_scope() if self.database else nullcontext()
     
-    def _get_existing_enrichment(self, lane: Lane) -> Optional[EnrichedData]:
+    def _get_existing_enrichment(self, lane: Lane, session) -> Optional[EnrichedData]:
         """Get existing enriched data from database"""
         if not self.database or not lane.origin_city_state or not lane.destination_city_state:
             return None
         
-        session = self.database.get_session()
-        try:
-            enriched_model = session.query(EnrichedDataModel).filter_by(
-                origin_city_state=lane.origin_city_state,
-                destination_city_state=lane.destination_city_state
-            ).first()
+        enriched_model = session.scalars(
+            select(EnrichedDataModel).where(
+                EnrichedDataModel.origin_city_state == lane.origin_city_state,
+                EnrichedDataModel.destination_city_state == lane.destination_city_state
+            ).limit(1)
+        ).first()
             
-            if enriched_model:
-                return EnrichedData(
-                    lane_id=enriched_model.lane_id,
-                    origin_city_state=enriched_model.origin_city_state,
-                    destination_city_state=enriched_model.destination_city_state,
-                    average_rate=enriched_model.average_rate,
-                    average_rate_per_mile=enriched_model.average_rate_per_mile,
-                    market_range_low=enriched_model.market_range_low,
-                    market_range_high=enriched_model.market_range_high,
-                    average_distance=enriched_model.average_distance,
-                    average_transit_time_hours=enriched_model.average_transit_time_hours,
-                    volume_index=enriched_model.volume_index,
-                    enrichment_source=enriched_model.enrichment_source,
-                    confidence_score=enriched_model.confidence_score,
-                    last_updated=enriched_model.last_updated
-                )
-        finally:
-            session.close()
+        if enriched_model:
+            return self._from_model(enriched_model)
         
         return None
     
-    def _enrich_from_dat(self, lane: Lane) -> Optional[EnrichedData]:
+    def _get_existing_enrichments_bulk(self, lanes: List[Lane], session) -> Dict[tuple, EnrichedData]:
+        """Get existing enriched data for many lanes, keyed by (origin, destination)"""
+        pairs = list({
+            (lane.origin_city_state, lane.destination_city_state) for lane in lanes
+            if lane.origin_city_state and lane.destination_city_state
+        })
+        if not self.database or not pairs:
+            return {}
+        
+        od = tuple_(EnrichedDataModel.origin_city_state, EnrichedDataModel.destination_city_state)
+        existing = {}
+        for start in range(0, len(pairs), UPSERT_BATCH_SIZE):
+            batch = pairs[start:start + UPSERT_BATCH_SIZE]
+            for enriched_model in session.scalars(select(EnrichedDataModel).where(od.in_(batch))):
+                key = (enriched_model.origin_city_state, enriched_model.destination_city_state)
+                existing.setdefault(key, self._from_model(enriched_model))
+        
+        return existing
+    
+    @staticmethod
+    def _from_model(enriched_model: EnrichedDataModel) -> EnrichedData:
+        """Convert a stored enrichment row to EnrichedData"""
+        return EnrichedData(
+            lane_id=enriched_model.lane_id,
+            origin_city_state=enriched_model.origin_city_state,
+            destination_city_state=enriched_model.destination_city_state,
+            average_rate=enriched_model.average_rate,
+            average_rate_per_mile=enriched_model.average_rate_per_mile,
+            market_range_low=enriched_model.market_range_low,
+            market_range_high=enriched_model.market_range_high,
+            average_distance=enriched_model.average_distance,
+            average_transit_time_hours=enriched_model.average_transit_time_hours,
+            volume_index=enriched_model.volume_index,
+            enrichment_source=enriched_model.enrichment_source,
+            confidence_score=enriched_model.confidence_score,
+            last_updated=enriched_model.last_updated
+        )
+    
+    # The source clients below take the per-request timeout (seconds) that
+    # their HTTP calls must pass on, e.g. requests.get(url, timeout=timeout)
+    
+    def _enrich_from_dat(self, lane: Lane, timeout: Optional[float] = None) -> Optional[EnrichedData]:
         """Enrich from DAT API (mock implementation)"""
         # In production, this would call DAT API
         # For now, return None to use estimation
         return None
     
-    def _enrich_from_truckstop(self, lane: Lane) -> Optional[EnrichedData]:
+    def _enrich_from_truckstop(self, lane: Lane, timeout: Optional[float] = None) -> Optional[EnrichedData]:
         """Enrich from Truckstop API (mock implementation)"""
         # In production, this would call Truckstop API
         return None
     
-    def _enrich_from_fmcsa(self, lane: Lane) -> Optional[EnrichedData]:
+    def _enrich_from_fmcsa(self, lane: Lane, timeout: Optional[float] = None) -> Optional[EnrichedData]:
         """Enrich from FMCSA data (mock implementation)"""
         # In production, this would query FMCSA database
         return None
     
-    def _estimate_enrichment(self, lane: Lane) -> EnrichedData:
+    def _estimate_enrichment(self, lane: Lane, now: Optional[datetime] = None) -> EnrichedData:
         """
         Estimate enrichment data based on lane characteristics.
         This is a fallback when external sources are unavailable.
@@ -166,7 +423,7 @@ class EnrichmentEngine:
             base_rate_per_mile = 2.00
         
         # Add some variation
-        rate_per_mile = base_rate_per_mile * (0.8 + random.random() * 0.4)
+        rate_per_mile = base_rate_per_mile * self._rng.uniform(0.8, 1.2)
         rate_amount = rate_per_mile * distance if distance else None
         
         # Estimate transit time (rough: 50 mph average)
@@ -185,62 +442,149 @@ class EnrichmentEngine:
             volume_index=0.5,  # Neutral volume
             enrichment_source=EnrichmentSource.ESTIMATED,
             confidence_score=0.6,  # Medium confidence for estimates
-            last_updated=datetime.now()
+            last_updated=now or datetime.now()
         )
     
-    def _save_enrichment(self, enriched: EnrichedData, lane: Lane):
+    def _estimate_enrichment_bulk(self, lanes: List[Lane]) -> List[EnrichedData]:
+        """
+        Estimate enrichment for many lanes at once.
+        
+        Same model as _estimate_enrichment, computed over NumPy arrays
+        (NaN marks an unknown distance).
+        """
+        if not lanes:
+            return []
+        
+        distances = np.array([
+            lane.distance_miles if lane.distance_miles
+            else 500.0 if lane.origin_city_state and lane.destination_city_state
+            else np.nan
+            for lane in lanes
+        ], dtype=np.float64)
+        
+        # Longer distances typically have lower rates per mile
+        base_rate_per_mile = np.where(distances < 100, 2.50, np.where(distances < 500, 2.00, 1.75))
+        base_rate_per_mile[np.isnan(distances)] = 2.00
+        
+        # Add some variation
+        rate_per_mile = base_rate_per_mile * self._rng.uniform(0.8, 1.2, size=len(lanes))
+        rate_amount = rate_per_mile * distances
+        transit_hours = distances / 50.0
+        market_low = rate_amount * 0.85
+        market_high = rate_amount * 1.15
+        
+        now = datetime.now()
+        return [
+            EnrichedData(
+                lane_id=lane.lane_id,
+                origin_city_state=lane.origin_city_state,
+                destination_city_state=lane.destination_city_state,
+                average_rate=_optional(rate_amount[i]),
+                average_rate_per_mile=float(rate_per_mile[i]),
+                market_range_low=_optional(market_low[i]),
+                market_range_high=_optional(market_high[i]),
+                average_distance=_optional(distances[i]),
+                average_transit_time_hours=_optional(transit_hours[i]),
+                volume_index=0.5,  # Neutral volume
+                enrichment_source=EnrichmentSource.ESTIMATED,
+                confidence_score=0.6,  # Medium confidence for estimates
+                last_updated=now
+            )
+            for i, lane in enumerate(lanes)
+        ]
+    
+    def _save_enrichment(self, enriched: EnrichedData, lane: Lane, session):
         """Save enriched data to database"""
         if not self.database:
             return
         
-        session = self.database.get_session()
+        # Only lanes with both endpoints can be looked up again
+        if lane.origin_city_state and lane.destination_city_state:
+            self._save_enrichments_bulk([(enriched, lane)], session)
+    
+    def _save_enrichments_bulk(self, enrichments: List[tuple], session):
+        """
+        Save (enriched, lane) pairs in one transaction.
+        
+        Upserts on (origin_city_state, destination_city_state), so each lane
+        pair has a single enrichment row that is refreshed on re-save.
+        """
+        rows = {}
+        for enriched, lane in enrichments:
+            row = self._enrichment_row(enriched, lane)
+            rows[(row['origin_city_state'], row['destination_city_state'])] = row
+        
         try:
-            enriched_model = EnrichedDataModel(
-                enriched_id=f"enriched_{lane.lane_id or hash(f'{lane.origin_city_state}→{lane.destination_city_state}')}",
-                lane_id=lane.lane_id,
-                origin_city_state=enriched.origin_city_state,
-                destination_city_state=enriched.destination_city_state,
-                average_rate=enriched.average_rate,
-                average_rate_per_mile=enriched.average_rate_per_mile,
-                market_range_low=enriched.market_range_low,
-                market_range_high=enriched.market_range_high,
-                average_distance=enriched.average_distance,
-                average_transit_time_hours=enriched.average_transit_time_hours,
-                volume_index=enriched.volume_index,
-                enrichment_source=enriched.enrichment_source,
-                confidence_score=enriched.confidence_score,
-                last_updated=enriched.last_updated
+            self.database.upsert(
+                session, EnrichedDataModel, list(rows.values()),
+                conflict_columns=['origin_city_state', 'destination_city_state']
             )
-            session.merge(enriched_model)
-            session.commit()
-        except Exception as e:
+        except Exception:
+            # Enrichment is a cache of estimates; keep going without it, but
+            # loudly, since every later save will likely fail the same way
             session.rollback()
-            print(f"Warning: Could not save enrichment: {e}")
-        finally:
-            session.close()
+            logger.exception("Could not save %d enrichment rows", len(rows))
+    
+    @staticmethod
+    def _enrichment_row(enriched: EnrichedData, lane: Lane) -> Dict[str, Any]:
+        """Column values for storing an enrichment"""
+        return {
+            'enriched_id': f"enriched_{lane.lane_id or stable_id(f'{lane.origin_city_state}→{lane.destination_city_state}')}",
+            'lane_id': lane.lane_id,
+            'origin_city_state': enriched.origin_city_state,
+            'destination_city_state': enriched.destination_city_state,
+            'average_rate': enriched.average_rate,
+            'average_rate_per_mile': enriched.average_rate_per_mile,
+            'market_range_low': enriched.market_range_low,
+            'market_range_high': enriched.market_range_high,
+            'average_distance': enriched.average_distance,
+            'average_transit_time_hours': enriched.average_transit_time_hours,
+            'volume_index': enriched.volume_index,
+            'enrichment_source': enriched.enrichment_source,
+            'confidence_score': enriched.confidence_score,
+            'last_updated': enriched.last_updated
+        }
     
     def fill_missing_rates(self, loads: List, lanes: List[Lane]) -> List:
         """Fill missing rates using enriched data"""
+        for _ in self.iter_filled_rates(loads, lanes):
+            pass
+        return loads
+    
+    def iter_filled_rates(self, loads: Iterable, lanes: List[Lane],
+                          chunk_size: int = FILL_RATES_CHUNK_SIZE) -> Iterator:
+        """
+        Fill missing rates lazily, yielding each load once it is processed.
+        
+        Loads are consumed in chunks; each chunk's lanes are enriched with a
+        single enrich_lanes call (one bulk lookup and one bulk save).
+        
+        Args:
+            loads: Loads to fill (any iterable)
+            lanes: Known lanes, preferred over a load's own lane when the endpoints match
+            chunk_size: Loads enriched per batch
+        """
         # Create lane lookup
         lane_lookup = {}
         for lane in lanes:
-            key = f"{lane.origin_city_state}→{lane.destination_city_state}"
+            key = (lane.origin_city_state, lane.destination_city_state)
             lane_lookup[key] = lane
         
-        for load in loads:
-            if not load.rate or not load.rate.rate_amount:
-                # Try to find lane
-                if load.lane:
-                    key = f"{load.lane.origin_city_state}→{load.lane.destination_city_state}"
-                    lane = lane_lookup.get(key, load.lane)
-                    
-                    # Enrich lane
-                    enriched = self.enrich_lane(lane)
-                    
+        loads = iter(loads)
+        while chunk := list(islice(loads, chunk_size)):
+            # Loads without a rate amount that have a lane to enrich
+            needs_rate = [load for load in chunk
+                          if (not load.rate or not load.rate.rate_amount) and load.lane]
+            lanes_to_enrich = [
+                lane_lookup.get((load.lane.origin_city_state, load.lane.destination_city_state), load.lane)
+                for load in needs_rate
+            ]
+            
+            if needs_rate:
+                for load, enriched in zip(needs_rate, self.enrich_lanes(lanes_to_enrich)):
                     if enriched and enriched.average_rate:
                         # Create rate from enriched data
                         if not load.rate:
-                            from schema import Rate, DataSource
                             load.rate = Rate(
                                 load_id=load.load_id,
                                 source=DataSource.ENRICHED,
@@ -250,6 +594,5 @@ class EnrichmentEngine:
                         load.rate.rate_amount = enriched.average_rate
                         load.rate.rate_per_mile = enriched.average_rate_per_mile
                         load.rate.rate_type = 'flat'
-        
-        return loads
-
+            
+            yield from chunk
@@ -0,0 +1,99 @@
+"""
+In-process background job queue.
+Runs long tasks (e.g. onboarding uploads) on worker threads so API requests
+can return immediately and clients poll for the result.
+
+Job state lives in this process's memory: run the API as a single process
+(threads are fine, e.g. gunicorn -w 1 --threads 8). With several worker
+processes a poll can land on a process that never saw the job and get a
+404, and queued or running jobs are lost when the process restarts.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional
+import threading
+import time
+import uuid
+
+
+class JobQueue:
+    """
+    Thread pool plus a job status table.
+    
+    Job status follows the queued → started → finished/failed lifecycle.
+    Completed jobs are kept for result_ttl seconds so clients can poll them.
+    """
+    
+    def __init__(self, max_workers: int = 2, result_ttl: int = 3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._ended: Dict[str, float] = {}  # job_id -> monotonic end time
+        self._lock = threading.Lock()
+    
+    def enqueue(self, func: Callable, *args, job_id: Optional[str] = None,
+                meta: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+        """
+        Queue func(*args, **kwargs) to run on a worker thread.
+        
+        Args:
+            func: Callable to run
+            job_id: Optional job ID (generated if not provided)
+            meta: Extra fields stored with the job and returned by get()
+        
+        Returns:
+            Job ID
+        """
+        job_id = job_id or str(uuid.uuid4())
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'enqueued_at': datetime.now(),
+                'started_at': None,
+                'ended_at': None,
+                'result': None,
+                'error': None,
+                **(meta or {})
+            }
+        self.executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a job's state, or None if unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def find(self, **meta) -> Optional[Dict[str, Any]]:
+        """Most recently enqueued job whose fields match meta"""
+        with self._lock:
+            for job in reversed(list(self._jobs.values())):
+                if all(job.get(key) == value for key, value in meta.items()):
+                    return dict(job)
+        return None
+    
+    def _run(self, job_id: str, func: Callable, args: tuple, kwargs: Dict[str, Any]):
+        self._update(job_id, status='started', started_at=datetime.now())
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._update(job_id, status='failed', error=str(e), ended_at=datetime.now())
+        else:
+            self._update(job_id, status='finished', result=result, ended_at=datetime.now())
+    
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                if fields.get('ended_at'):
+                    self._ended[job_id] = time.monotonic()
+    
+    def _prune(self):
+        """Drop completed jobs older than result_ttl (caller holds the lock)"""
+        cutoff = time.monotonic() - self.result_ttl
+        for job_id in [job_id for job_id, ended in self._ended.items() if ended < cutoff]:
+            del self._ended[job_id]
+            self._jobs.pop(job_id, None)
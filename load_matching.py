@@ -5,8 +5,56 @@ Ranks loads based on carrier's past booking history and preferences.
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from dataclasses import dataclass
+import heapq
+import statistics
 
-from schema import CarrierProfile, Load, Lane, Broker
+import numpy as np
+import pandas as pd
+
+from schema import CarrierProfile, Load, Lane, Broker, Rate, DataSource
+
+# Flattened load fields read by LoadMatchingEngine.match_from_df
+# (the column names pd.json_normalize gives Load.to_dict() records)
+LOAD_FRAME_COLUMNS = [
+    'load_id', 'equipment_type',
+    'broker.mc_id', 'broker.company_name',
+    'lane.origin_city_state', 'lane.destination_city_state', 'lane.distance_miles',
+    'rate.rate_amount'
+]
+LOAD_FRAME_NUMERIC_COLUMNS = ['lane.distance_miles', 'rate.rate_amount']
+
+
+def loads_to_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build a DataFrame of available loads from JSON records.
+    
+    Records use the Load.to_dict() shape (nested broker/lane/rate objects);
+    nested fields are flattened to dotted column names. Missing columns are
+    added as empty and numeric columns are coerced in one pass.
+    """
+    df = pd.json_normalize(records) if records else pd.DataFrame()
+    df = df.reindex(columns=LOAD_FRAME_COLUMNS).astype(object)
+    for column in LOAD_FRAME_NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+_NO_DETAIL = object()
+
+
+class MatchReason(str):
+    """
+    Match reason text that also carries its match type.
+    
+    Behaves as the display string ("<type>: <detail>") everywhere, so
+    reasons serialize as plain strings, while summaries read match_type
+    without re-parsing the text.
+    """
+    
+    def __new__(cls, match_type: str, detail: Any = _NO_DETAIL):
+        reason = super().__new__(cls, match_type if detail is _NO_DETAIL else f"{match_type}: {detail}")
+        reason.match_type = match_type
+        return reason
 
 
 @dataclass
@@ -29,6 +77,28 @@ class LoadMatchingEngine:
     
     def __init__(self, carrier_profile: CarrierProfile):
         self.carrier_profile = carrier_profile
+        
+        # Index the profile history once so scoring a load is O(1)
+        # (the profile is treated as read-only after this point)
+        self._past_brokers = {past_load.broker.mc_id for past_load in carrier_profile.loads
+                              if past_load.broker and past_load.broker.mc_id}
+        self._past_lanes = {(past_lane.origin_city_state, past_lane.destination_city_state)
+                            for past_lane in carrier_profile.lanes}
+        # A load's (origin, destination) is in here when it is the return trip of a past lane
+        self._reverse_lanes = {(destination, origin) for origin, destination in self._past_lanes}
+        # Rank scores ((L - rank) / L by first occurrence) for each preference list
+        self._broker_rank_score = self._rank_scores(carrier_profile.preferred_brokers)
+        # Preferred lanes are stored as "origin→destination"; match on (origin, destination)
+        self._preferred_lane_pairs = [self._lane_pair(lane_key) for lane_key in carrier_profile.preferred_lanes]
+        self._lane_rank_score = self._rank_scores(self._preferred_lane_pairs)
+        self._equipment_rank_score = self._rank_scores(carrier_profile.preferred_equipment)
+        
+        # Average historical rate per mile is a profile property, not a per-load one
+        historical_rates = [past_load.rate.rate_per_mile for past_load in carrier_profile.loads
+                            if (past_load.rate and past_load.rate.rate_per_mile and
+                                past_load.lane and past_load.lane.distance_miles)]
+        self._avg_historical_rpm = statistics.fmean(historical_rates) if historical_rates else None
+        
         self.match_weights = {
             'past_broker': 0.3,      # Matched with past broker
             'past_lane': 0.4,         # Matched with past lane
@@ -37,6 +107,16 @@ class LoadMatchingEngine:
             'rate_quality': 0.1,      # Rate quality vs market
             'enrichment_confidence': 0.05  # Confidence in enriched data
         }
+        
+        # Weights bound as plain floats for the scorers (read once, at construction)
+        weights = self.match_weights
+        self._w_past_broker = weights['past_broker']
+        self._w_historical_broker = weights['past_broker'] * 0.5
+        self._w_past_lane = weights['past_lane']
+        self._w_reverse_lane = weights['past_lane'] * 0.7  # Slightly lower for reverse
+        self._w_preferred_lane = weights['preferred_lane']
+        self._w_preferred_equipment = weights['preferred_equipment']
+        self._w_rate_quality = weights['rate_quality']
     
     def match_loads(self, available_loads: List[Load], limit: int = 10) -> List[LoadMatch]:
         """
@@ -49,20 +129,320 @@ class LoadMatchingEngine:
         Returns:
             List of LoadMatch objects sorted by score (highest first)
         """
-        matches = []
+        if limit <= 0:
+            return []
         
-        for load in available_loads:
+        # Min-heap of the best `limit` candidates as (score, -index, reasons, load);
+        # on equal scores the later load sits at the root, matching a stable sort
+        heap = []
+        for index, load in enumerate(available_loads):
+            if len(heap) >= limit and self._score_ceiling(load) <= heap[0][0]:
+                continue  # Can't beat the current floor, skip scoring
             score, reasons = self._calculate_match_score(load)
+            entry = (score, -index, reasons, load)
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+        
+        # Only the survivors become LoadMatch objects
+        heap.sort(reverse=True)
+        return [LoadMatch(load=load, score=score, match_reasons=reasons)
+                for score, _, reasons, load in heap]
+    
+    def match_loads_batch(self, available_loads: List[Load], limit: int = 10) -> List[LoadMatch]:
+        """
+        Match a batch of available loads using vectorized scoring.
+        
+        Produces the same ranking as match_loads, but scores all loads with
+        NumPy in one pass and only builds match reasons for the top results.
+        
+        Args:
+            available_loads: List of available loads to match
+            limit: Maximum number of matches to return
+            
+        Returns:
+            List of LoadMatch objects sorted by score (highest first)
+        """
+        if not available_loads or limit <= 0:
+            return []
+        
+        scores = self.score_batch(available_loads)
+        
+        matches = []
+        for i in self._top_k(scores, limit):
+            load = available_loads[i]
+            _, reasons = self._calculate_match_score(load)
             matches.append(LoadMatch(
                 load=load,
-                score=score,
+                score=float(scores[i]),
                 match_reasons=reasons
             ))
         
-        # Sort by score (descending)
-        matches.sort(key=lambda x: x.score, reverse=True)
+        return matches
+    
+    def score_batch(self, loads: List[Load]) -> np.ndarray:
+        """
+        Calculate match scores for many loads at once.
+        
+        Each load is encoded as an index into the carrier's preference
+        vocabularies (brokers, lanes, equipment). Multiplying that one-hot
+        encoding by the rank-score vector of each vocabulary is done as an
+        index gather, so no dense one-hot matrix is materialized. Historical
+        matches and rate quality are computed as boolean/float arrays.
+        
+        Returns:
+            Array of scores aligned with loads (same values as _calculate_match_score)
+        """
+        context = self._score_context()
+        broker_vocab, lane_vocab, equipment_vocab = context['vocabs']
+        past_brokers = context['past_brokers']
+        past_lanes = context['past_lanes']
+        reverse_lanes = context['reverse_lanes']
+        
+        n = len(loads)
+        broker_idx = np.full(n, len(broker_vocab), dtype=np.intp)
+        lane_idx = np.full(n, len(lane_vocab), dtype=np.intp)
+        equipment_idx = np.full(n, len(equipment_vocab), dtype=np.intp)
+        historical_broker = np.zeros(n, dtype=bool)
+        exact_lane = np.zeros(n, dtype=bool)
+        reverse_lane = np.zeros(n, dtype=bool)
+        rate_per_mile = np.full(n, np.nan)
+        
+        for i, load in enumerate(loads):
+            if load.broker and load.broker.mc_id:
+                mc_id = load.broker.mc_id
+                broker_idx[i] = broker_vocab.get(mc_id, broker_idx[i])
+                historical_broker[i] = mc_id in past_brokers
+            
+            lane = load.lane
+            if lane and lane.origin_city_state and lane.destination_city_state:
+                lane_pair = (lane.origin_city_state, lane.destination_city_state)
+                lane_idx[i] = lane_vocab.get(lane_pair, lane_idx[i])
+                exact_lane[i] = lane_pair in past_lanes
+                reverse_lane[i] = lane_pair in reverse_lanes
+            
+            if load.equipment_type:
+                equipment_idx[i] = equipment_vocab.get(load.equipment_type, equipment_idx[i])
+            
+            if load.rate and load.rate.rate_amount and lane and lane.distance_miles:
+                rate_per_mile[i] = load.rate.rate_amount / lane.distance_miles
         
-        return matches[:limit]
+        return self._combine_scores(context, broker_idx, historical_broker, lane_idx,
+                                    exact_lane, reverse_lane, equipment_idx, rate_per_mile)
+    
+    def match_from_df(self, loads_df: pd.DataFrame, limit: int = 10) -> List[LoadMatch]:
+        """
+        Match available loads given as a DataFrame (see loads_to_frame).
+        
+        Scores every row with column operations and only builds Load objects
+        for the returned matches. Ranks exactly like match_loads_batch.
+        
+        Args:
+            loads_df: One row per available load, LOAD_FRAME_COLUMNS columns
+            limit: Maximum number of matches to return
+            
+        Returns:
+            List of LoadMatch objects sorted by score (highest first)
+        """
+        if loads_df.empty or limit <= 0:
+            return []
+        
+        scores = self.score_frame(loads_df)
+        
+        matches = []
+        for i in self._top_k(scores, limit):
+            load = self._load_from_row(loads_df.iloc[i])
+            _, reasons = self._calculate_match_score(load)
+            matches.append(LoadMatch(
+                load=load,
+                score=float(scores[i]),
+                match_reasons=reasons
+            ))
+        
+        return matches
+    
+    def score_frame(self, loads_df: pd.DataFrame) -> np.ndarray:
+        """
+        Calculate match scores for a DataFrame of loads.
+        
+        Same features as score_batch, computed with pandas column operations
+        instead of a per-load loop.
+        
+        Returns:
+            Array of scores aligned with the DataFrame rows
+        """
+        context = self._score_context()
+        broker_vocab, lane_vocab, equipment_vocab = context['vocabs']
+        
+        # Empty strings count as missing, like the truthiness checks in score_batch
+        mc_id = loads_df['broker.mc_id'].replace('', None)
+        origin = loads_df['lane.origin_city_state'].replace('', None)
+        destination = loads_df['lane.destination_city_state'].replace('', None)
+        equipment = loads_df['equipment_type'].replace('', None)
+        has_lane = (origin.notna() & destination.notna()).to_numpy()
+        
+        broker_idx = self._vocab_index(mc_id, broker_vocab)
+        historical_broker = mc_id.isin(context['past_brokers']).to_numpy() & mc_id.notna().to_numpy()
+        
+        lane_pairs = pd.MultiIndex.from_arrays([origin, destination])
+        lane_idx = np.full(len(loads_df), len(lane_vocab), dtype=np.intp)
+        if lane_vocab:
+            found = pd.MultiIndex.from_tuples(list(lane_vocab)).get_indexer(lane_pairs)
+            lane_idx = np.where(has_lane & (found >= 0), found, lane_idx)
+        exact_lane = has_lane & lane_pairs.isin(list(context['past_lanes']))
+        reverse_lane = has_lane & lane_pairs.isin(list(context['reverse_lanes']))
+        
+        equipment_idx = self._vocab_index(equipment, equipment_vocab)
+        
+        rate_amount = loads_df['rate.rate_amount'].to_numpy(dtype=float)
+        distance = loads_df['lane.distance_miles'].to_numpy(dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate_per_mile = np.where((rate_amount != 0) & (distance != 0),
+                                     rate_amount / distance, np.nan)
+        
+        return self._combine_scores(context, broker_idx, historical_broker, lane_idx,
+                                    exact_lane, reverse_lane, equipment_idx, rate_per_mile)
+    
+    def _score_context(self) -> Dict[str, Any]:
+        """Preference vocabularies and history lookups shared by the batch scorers"""
+        # Rank-score vectors; the trailing 0.0 slot is the "not preferred" column
+        broker_vocab, broker_rank_scores = self._rank_vector(self._broker_rank_score)
+        lane_vocab, lane_rank_scores = self._rank_vector(self._lane_rank_score)
+        equipment_vocab, equipment_rank_scores = self._rank_vector(self._equipment_rank_score)
+        
+        return {
+            'vocabs': (broker_vocab, lane_vocab, equipment_vocab),
+            'rank_scores': (broker_rank_scores, lane_rank_scores, equipment_rank_scores),
+            'past_brokers': self._past_brokers,
+            'past_lanes': self._past_lanes,
+            'reverse_lanes': self._reverse_lanes,
+            'avg_rate': self._avg_historical_rpm
+        }
+    
+    def _combine_scores(self, context: Dict[str, Any], broker_idx: np.ndarray,
+                        historical_broker: np.ndarray, lane_idx: np.ndarray,
+                        exact_lane: np.ndarray, reverse_lane: np.ndarray,
+                        equipment_idx: np.ndarray, rate_per_mile: np.ndarray) -> np.ndarray:
+        """Weight and sum per-load feature arrays into final scores"""
+        broker_rank_scores, lane_rank_scores, equipment_rank_scores = context['rank_scores']
+        
+        # Accumulate in the same order as _calculate_match_score so results match exactly
+        scores = self._w_past_broker * broker_rank_scores[broker_idx]
+        scores = scores + np.where(historical_broker, self._w_historical_broker, 0.0)
+        scores = scores + self._w_preferred_lane * lane_rank_scores[lane_idx]
+        scores = scores + np.where(exact_lane, self._w_past_lane, 0.0)
+        scores = scores + np.where(reverse_lane, self._w_reverse_lane, 0.0)
+        scores = scores + self._w_preferred_equipment * equipment_rank_scores[equipment_idx]
+        
+        avg_rate = context['avg_rate']
+        if avg_rate is not None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rate_diff = np.abs(rate_per_mile - avg_rate) / avg_rate
+                rate_ok = rate_diff <= 0.2
+            rate_score = np.where(rate_ok, 1.0 - (rate_diff / 0.2), 0.0)
+            scores = scores + np.where(rate_ok, self._w_rate_quality * rate_score, 0.0)
+        
+        # Normalize score to 0-1 range
+        scores = np.minimum(scores, 1.0)
+        
+        # Base score for new carriers with sparse data
+        if len(self.carrier_profile.loads) < 5:
+            scores = np.where(scores < 0.1, 0.3, scores)
+        
+        return scores
+    
+    @staticmethod
+    def _vocab_index(values: pd.Series, vocab: Dict[str, int]) -> np.ndarray:
+        """Vocabulary column index per value; missing/unknown values get the trailing slot"""
+        return values.map(vocab).fillna(len(vocab)).to_numpy(dtype=np.intp)
+    
+    @staticmethod
+    def _load_from_row(row: pd.Series) -> Load:
+        """Build a Load from one loads_to_frame row"""
+        values = {key: (None if pd.isna(value) else value) for key, value in row.items()}
+        
+        broker = None
+        if values['broker.mc_id'] is not None or values['broker.company_name'] is not None:
+            broker = Broker(mc_id=values['broker.mc_id'], company_name=values['broker.company_name'])
+        
+        lane = None
+        if (values['lane.origin_city_state'] is not None or
+                values['lane.destination_city_state'] is not None):
+            lane = Lane(
+                origin_city_state=values['lane.origin_city_state'],
+                destination_city_state=values['lane.destination_city_state'],
+                distance_miles=values['lane.distance_miles']
+            )
+        
+        rate = None
+        if values['rate.rate_amount'] is not None:
+            rate = Rate(rate_amount=values['rate.rate_amount'], load_id=values['load_id'])
+        
+        return Load(
+            load_id=values['load_id'],
+            broker=broker,
+            lane=lane,
+            rate=rate,
+            equipment_type=values['equipment_type'],
+            source=DataSource.MANUAL
+        )
+    
+    @staticmethod
+    def _lane_pair(lane_key: str) -> Optional[tuple]:
+        """Split an "origin→destination" lane key into a pair (None if malformed)"""
+        origin, arrow, destination = lane_key.partition('→')
+        return (origin, destination) if arrow else None
+    
+    @staticmethod
+    def _rank_scores(items: List[Any]) -> Dict[Any, float]:
+        """Map each preference item to (len - rank) / len, ranked by first occurrence"""
+        total = len(items)
+        scores = {}
+        for rank, item in enumerate(items):
+            if item not in scores:
+                scores[item] = (total - rank) / total
+        return scores
+    
+    @staticmethod
+    def _rank_vector(rank_scores: Dict[Any, float]) -> tuple:
+        """
+        Build a vocabulary index and rank-score vector from a rank-score table.
+        
+        Returns:
+            Tuple of (item -> column index, scores array with a trailing 0.0 slot)
+        """
+        vocab = {item: index for index, item in enumerate(rank_scores)}
+        return vocab, np.array([*rank_scores.values(), 0.0])
+    
+    @staticmethod
+    def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+        """
+        Indices of the highest scores, best first.
+        
+        Ties keep input order (like a stable sort) without sorting every score.
+        """
+        n = len(scores)
+        if limit >= n:
+            return np.argsort(-scores, kind='stable')
+        
+        threshold = np.partition(scores, n - limit)[n - limit]
+        candidates = np.flatnonzero(scores >= threshold)
+        order = np.argsort(-scores[candidates], kind='stable')
+        return candidates[order][:limit]
+    
+    def _score_ceiling(self, load: Load) -> float:
+        """Cheap upper bound on _calculate_match_score for a load"""
+        if (load.broker and load.broker.mc_id) or (
+                load.lane and load.lane.origin_city_state and load.lane.destination_city_state):
+            return 1.0
+        # Only equipment and rate quality can contribute
+        ceiling = self._w_rate_quality
+        if load.equipment_type in self._equipment_rank_score:
+            ceiling += self._w_preferred_equipment
+        if len(self.carrier_profile.loads) < 5:
+            ceiling = max(ceiling, 0.3)  # New-carrier base score
+        return ceiling
     
     def _calculate_match_score(self, load: Load) -> tuple:
         """
@@ -73,86 +453,77 @@ class LoadMatchingEngine:
         """
         score = 0.0
         reasons = []
+        profile = self.carrier_profile
+        
+        # Read each load attribute once
+        broker = load.broker
+        lane = load.lane
+        rate = load.rate
+        mc_id = broker.mc_id if broker else None
+        origin = lane.origin_city_state if lane else None
+        destination = lane.destination_city_state if lane else None
+        distance = lane.distance_miles if lane else None
+        equipment_type = load.equipment_type
         
         # Check past broker match
-        if load.broker and load.broker.mc_id:
-            if load.broker.mc_id in self.carrier_profile.preferred_brokers:
-                broker_rank = self.carrier_profile.preferred_brokers.index(load.broker.mc_id)
-                # Higher score for higher rank (more frequent)
-                broker_score = (len(self.carrier_profile.preferred_brokers) - broker_rank) / len(self.carrier_profile.preferred_brokers)
-                score += self.match_weights['past_broker'] * broker_score
-                reasons.append(f"Past broker match: {load.broker.company_name}")
+        if mc_id:
+            # Higher score for higher rank (more frequent)
+            broker_score = self._broker_rank_score.get(mc_id)
+            if broker_score is not None:
+                score += self._w_past_broker * broker_score
+                reasons.append(MatchReason("Past broker match", broker.company_name))
             
             # Also check if broker appears in historical loads
-            for past_load in self.carrier_profile.loads:
-                if past_load.broker and past_load.broker.mc_id == load.broker.mc_id:
-                    score += self.match_weights['past_broker'] * 0.5
-                    reasons.append(f"Historical broker: {load.broker.company_name}")
-                    break
+            if mc_id in self._past_brokers:
+                score += self._w_historical_broker
+                reasons.append(MatchReason("Historical broker", broker.company_name))
         
         # Check lane match
-        if load.lane and load.lane.origin_city_state and load.lane.destination_city_state:
-            lane_key = f"{load.lane.origin_city_state}→{load.lane.destination_city_state}"
+        if origin and destination:
+            lane_pair = (origin, destination)
             
             # Check preferred lanes
-            if lane_key in self.carrier_profile.preferred_lanes:
-                lane_rank = self.carrier_profile.preferred_lanes.index(lane_key)
-                lane_score = (len(self.carrier_profile.preferred_lanes) - lane_rank) / len(self.carrier_profile.preferred_lanes)
-                score += self.match_weights['preferred_lane'] * lane_score
-                reasons.append(f"Preferred lane: {lane_key}")
+            lane_score = self._lane_rank_score.get(lane_pair)
+            if lane_score is not None:
+                score += self._w_preferred_lane * lane_score
+                reasons.append(MatchReason("Preferred lane", f"{origin}→{destination}"))
             
             # Check past lanes (exact match)
-            for past_lane in self.carrier_profile.lanes:
-                if (past_lane.origin_city_state == load.lane.origin_city_state and
-                    past_lane.destination_city_state == load.lane.destination_city_state):
-                    score += self.match_weights['past_lane']
-                    reasons.append(f"Exact lane match: {lane_key}")
-                    break
+            if lane_pair in self._past_lanes:
+                score += self._w_past_lane
+                reasons.append(MatchReason("Exact lane match", f"{origin}→{destination}"))
             
             # Check reverse lane (return trip)
-            reverse_key = f"{load.lane.destination_city_state}→{load.lane.origin_city_state}"
-            for past_lane in self.carrier_profile.lanes:
-                if (past_lane.origin_city_state == load.lane.destination_city_state and
-                    past_lane.destination_city_state == load.lane.origin_city_state):
-                    score += self.match_weights['past_lane'] * 0.7  # Slightly lower for reverse
-                    reasons.append(f"Reverse lane match: {reverse_key}")
-                    break
+            if lane_pair in self._reverse_lanes:
+                score += self._w_reverse_lane
+                reasons.append(MatchReason("Reverse lane match", f"{destination}→{origin}"))
         
         # Check equipment type match
-        if load.equipment_type and load.equipment_type in self.carrier_profile.preferred_equipment:
-            eq_rank = self.carrier_profile.preferred_equipment.index(load.equipment_type)
-            eq_score = (len(self.carrier_profile.preferred_equipment) - eq_rank) / len(self.carrier_profile.preferred_equipment)
-            score += self.match_weights['preferred_equipment'] * eq_score
-            reasons.append(f"Preferred equipment: {load.equipment_type}")
-        
-        # Check rate quality
-        if load.rate and load.rate.rate_amount and load.lane and load.lane.distance_miles:
+        eq_score = self._equipment_rank_score.get(equipment_type) if equipment_type else None
+        if eq_score is not None:
+            score += self._w_preferred_equipment * eq_score
+            reasons.append(MatchReason("Preferred equipment", equipment_type))
+        
+        # Check rate quality against the historical average (skipped with no history)
+        avg_rate = self._avg_historical_rpm
+        if avg_rate is not None and rate and rate.rate_amount and distance:
             # Calculate rate per mile
-            rate_per_mile = load.rate.rate_amount / load.lane.distance_miles
-            
-            # Compare with historical rates
-            historical_rates = []
-            for past_load in self.carrier_profile.loads:
-                if (past_load.rate and past_load.rate.rate_per_mile and
-                    past_load.lane and past_load.lane.distance_miles):
-                    historical_rates.append(past_load.rate.rate_per_mile)
+            rate_per_mile = rate.rate_amount / distance
             
-            if historical_rates:
-                avg_rate = sum(historical_rates) / len(historical_rates)
-                # Score based on how close to average (within 20% is good)
-                rate_diff = abs(rate_per_mile - avg_rate) / avg_rate
-                if rate_diff <= 0.2:
-                    rate_score = 1.0 - (rate_diff / 0.2)
-                    score += self.match_weights['rate_quality'] * rate_score
-                    reasons.append(f"Rate quality: ${rate_per_mile:.2f}/mile (avg: ${avg_rate:.2f})")
+            # Score based on how close to average (within 20% is good)
+            rate_diff = abs(rate_per_mile - avg_rate) / avg_rate
+            if rate_diff <= 0.2:
+                rate_score = 1.0 - (rate_diff / 0.2)
+                score += self._w_rate_quality * rate_score
+                reasons.append(MatchReason("Rate quality", f"${rate_per_mile:.2f}/mile (avg: ${avg_rate:.2f})"))
         
         # Normalize score to 0-1 range
         score = min(1.0, score)
         
         # If no specific matches, give a base score for sparse data scenarios
-        if score < 0.1 and len(self.carrier_profile.loads) < 5:
+        if score < 0.1 and len(profile.loads) < 5:
             score = 0.3  # Base score for new carriers
-            reasons.append("New carrier - base match score")
+            reasons.append(MatchReason("New carrier - base match score"))
         
         return score, reasons
     
@@ -173,7 +544,10 @@ class LoadMatchingEngine:
         match_types = {}
         for match in matches:
             for reason in match.match_reasons:
-                match_type = reason.split(':')[0] if ':' in reason else reason
+                match_type = getattr(reason, 'match_type', None)
+                if match_type is None:
+                    # Plain string reasons (e.g. built outside the engine)
+                    match_type = reason.split(':')[0] if ':' in reason else reason
                 match_types[match_type] = match_types.get(match_type, 0) + 1
         
         return {
@@ -0,0 +1,61 @@
+"""
+Alembic environment for the carrier data database.
+Runs against the connection Database passes in, or DATABASE_URL / alembic.ini.
+"""
+from logging.config import fileConfig
+import os
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from database import Base
+
+config = context.config
+
+# Only configure logging when run from the alembic command line
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit migration SQL without a database connection"""
+    context.configure(
+        url=os.getenv('DATABASE_URL') or config.get_main_option('sqlalchemy.url'),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'},
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations on a live connection"""
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        # Called from Database: reuse its connection (and its transaction)
+        _run(connection)
+        return
+    
+    section = config.get_section(config.config_ini_section, {})
+    if os.getenv('DATABASE_URL'):
+        section['sqlalchemy.url'] = os.environ['DATABASE_URL']
+    connectable = engine_from_config(section, prefix='sqlalchemy.', poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    # Batch mode lets ALTERs work on SQLite (table copy and move)
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
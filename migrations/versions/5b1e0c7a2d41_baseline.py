@@ -0,0 +1,28 @@
+"""Baseline: schema created by Base.metadata.create_all before migrations
+
+Revision ID: 5b1e0c7a2d41
+Revises: 
+Create Date: 2026-10-16 09:00:00
+
+Databases created before migrations were introduced are at this revision.
+Tables are still created by Database (create_all); later revisions only
+alter tables that already exist, so they are no-ops on a fresh database.
+"""
+from typing import Sequence, Union
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e0c7a2d41'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
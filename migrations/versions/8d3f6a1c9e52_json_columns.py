@@ -0,0 +1,86 @@
+"""Rewrite legacy str() values in JSON columns as JSON
+
+Revision ID: 8d3f6a1c9e52
+Revises: 5b1e0c7a2d41
+Create Date: 2026-10-16 09:10:00
+
+Before these columns became JSON they were Text holding str(dict) /
+str(list), e.g. "{'city': 'Miami', 'zip_code': None}", which JSON readers
+reject. Such values are parsed as Python literals and stored as JSON; a
+value that is not a literal either is kept as a JSON string.
+"""
+from typing import Sequence, Union
+import ast
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f6a1c9e52'
+down_revision: Union[str, Sequence[str], None] = '5b1e0c7a2d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Table -> (primary key, JSON columns)
+JSON_COLUMNS = {
+    'brokers': ('broker_id', ('company_address',)),
+    'lanes': ('lane_id', ('origin_address', 'destination_address')),
+    'loads': ('load_id', ('raw_data',)),
+    'carrier_profiles': ('carrier_id', ('preferred_lanes', 'preferred_equipment', 'preferred_brokers')),
+}
+
+
+def _to_json(value: str) -> str:
+    """JSON text for a stored value (unchanged if it already is JSON)"""
+    try:
+        json.loads(value)
+        return value
+    except ValueError:
+        pass
+    try:
+        return json.dumps(ast.literal_eval(value), default=str)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return json.dumps(value)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, (primary_key, columns) in JSON_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        types = {column['name']: column['type'] for column in inspector.get_columns(table)}
+        # Already-JSON columns (PostgreSQL) can't hold legacy text
+        text_columns = [column for column in columns if not isinstance(types.get(column), sa.JSON)]
+        for column in text_columns:
+            rows = bind.execute(sa.text(
+                f"SELECT {primary_key}, {column} FROM {table} WHERE {column} IS NOT NULL"
+            )).all()
+            updates = [
+                {'pk': key, 'value': converted}
+                for key, value in rows
+                if isinstance(value, str) and (converted := _to_json(value)) != value
+            ]
+            if updates:
+                bind.execute(
+                    sa.text(f"UPDATE {table} SET {column} = :value WHERE {primary_key} = :pk"),
+                    updates
+                )
+
+        if bind.dialect.name == 'postgresql':
+            for column in text_columns:
+                op.alter_column(table, column, type_=sa.JSON(), postgresql_using=f'{column}::json')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Values stay JSON text; only the PostgreSQL column types go back
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    for table, (_, columns) in JSON_COLUMNS.items():
+        for column in columns:
+            op.alter_column(table, column, type_=sa.Text(), postgresql_using=f'{column}::text')
@@ -0,0 +1,54 @@
+"""Add loads.carrier_id
+
+Revision ID: c47e2b9d0a13
+Revises: 8d3f6a1c9e52
+Create Date: 2026-10-16 09:20:00
+
+Loads saved before this column existed were not linked to a carrier. When
+the database holds a single carrier profile they can only belong to it and
+are backfilled; otherwise they are left unlinked (they were never
+reachable from a carrier before either).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47e2b9d0a13'
+down_revision: Union[str, Sequence[str], None] = '8d3f6a1c9e52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('loads'):
+        return
+
+    if 'carrier_id' not in {column['name'] for column in inspector.get_columns('loads')}:
+        with op.batch_alter_table('loads') as batch_op:
+            batch_op.add_column(sa.Column('carrier_id', sa.String(), nullable=True))
+            batch_op.create_foreign_key(
+                'fk_loads_carrier_id', 'carrier_profiles', ['carrier_id'], ['carrier_id']
+            )
+
+    if 'ix_loads_carrier_id' not in {index['name'] for index in inspector.get_indexes('loads')}:
+        op.create_index('ix_loads_carrier_id', 'loads', ['carrier_id'])
+
+    carrier_ids = bind.execute(sa.text("SELECT carrier_id FROM carrier_profiles LIMIT 2")).scalars().all()
+    if len(carrier_ids) == 1:
+        bind.execute(
+            sa.text("UPDATE loads SET carrier_id = :carrier_id WHERE carrier_id IS NULL"),
+            {'carrier_id': carrier_ids[0]}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_loads_carrier_id', table_name='loads')
+    with op.batch_alter_table('loads') as batch_op:
+        batch_op.drop_column('carrier_id')
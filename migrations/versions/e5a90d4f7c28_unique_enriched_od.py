@@ -0,0 +1,75 @@
+"""Make ix_enriched_od unique
+
+Revision ID: e5a90d4f7c28
+Revises: c47e2b9d0a13
+Create Date: 2026-10-16 09:30:00
+
+Enrichment is upserted ON CONFLICT (origin_city_state,
+destination_city_state), which needs a unique index on that pair.
+Duplicate rows for a pair are removed first, keeping the most recently
+updated one.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a90d4f7c28'
+down_revision: Union[str, Sequence[str], None] = 'c47e2b9d0a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows deleted per statement
+DELETE_BATCH_SIZE = 500
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('enriched_data'):
+        return
+
+    indexes = {index['name']: index for index in inspector.get_indexes('enriched_data')}
+    current = indexes.get('ix_enriched_od')
+    if current is not None and current['unique']:
+        return
+
+    # Newest row per pair first; every later row for the pair is a duplicate
+    rows = bind.execute(sa.text(
+        "SELECT enriched_id, origin_city_state, destination_city_state FROM enriched_data "
+        "WHERE origin_city_state IS NOT NULL AND destination_city_state IS NOT NULL "
+        "ORDER BY origin_city_state, destination_city_state, "
+        "last_updated IS NULL, last_updated DESC, enriched_id DESC"
+    )).all()
+    seen = set()
+    duplicates = []
+    for enriched_id, origin, destination in rows:
+        if (origin, destination) in seen:
+            duplicates.append(enriched_id)
+        else:
+            seen.add((origin, destination))
+    for start in range(0, len(duplicates), DELETE_BATCH_SIZE):
+        bind.execute(
+            sa.text("DELETE FROM enriched_data WHERE enriched_id IN :ids").bindparams(
+                sa.bindparam('ids', expanding=True)
+            ),
+            {'ids': duplicates[start:start + DELETE_BATCH_SIZE]}
+        )
+
+    if current is not None:
+        op.drop_index('ix_enriched_od', table_name='enriched_data')
+    # Superseded by the composite index, which leads with this column
+    if 'ix_enriched_data_origin_city_state' in indexes:
+        op.drop_index('ix_enriched_data_origin_city_state', table_name='enriched_data')
+    op.create_index(
+        'ix_enriched_od', 'enriched_data', ['origin_city_state', 'destination_city_state'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_enriched_od', table_name='enriched_data')
+    op.create_index('ix_enriched_od', 'enriched_data', ['origin_city_state', 'destination_city_state'])
@@ -0,0 +1,46 @@
+"""Add ix_lane_od and ix_load_broker_equip
+
+Revision ID: f3b8c61e4a97
+Revises: e5a90d4f7c28
+Create Date: 2026-10-16 09:40:00
+
+Lane pairs are looked up by (origin_city_state, destination_city_state) and
+loads by (broker_id, equipment_type). The single-column origin index on
+lanes is dropped: ix_lane_od leads with that column.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8c61e4a97'
+down_revision: Union[str, Sequence[str], None] = 'e5a90d4f7c28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table('lanes'):
+        indexes = {index['name'] for index in inspector.get_indexes('lanes')}
+        if 'ix_lane_od' not in indexes:
+            op.create_index('ix_lane_od', 'lanes', ['origin_city_state', 'destination_city_state'])
+        # Superseded by the composite index, which leads with this column
+        if 'ix_lanes_origin_city_state' in indexes:
+            op.drop_index('ix_lanes_origin_city_state', table_name='lanes')
+
+    if inspector.has_table('loads'):
+        indexes = {index['name'] for index in inspector.get_indexes('loads')}
+        if 'ix_load_broker_equip' not in indexes:
+            op.create_index('ix_load_broker_equip', 'loads', ['broker_id', 'equipment_type'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_load_broker_equip', table_name='loads')
+    op.create_index('ix_lanes_origin_city_state', 'lanes', ['origin_city_state'])
+    op.drop_index('ix_lane_od', table_name='lanes')
@@ -5,12 +5,25 @@ Handles deduplication, standardization, and data quality improvements.
 from typing import List, Dict, Set, Optional
 from datetime import datetime
 import re
-from collections import defaultdict
+import sys
+from collections import Counter
+from functools import lru_cache
 
 from schema import (
     Broker, Load, Lane, Rate, Address, CarrierProfile,
     DataSource
 )
+from parser.utils import digits_only
+
+# Distinct values memoized per normalizer (MC numbers, company names, city-states)
+NORMALIZE_CACHE_SIZE = 4096
+
+# Compiled once; these run for every broker, lane and address
+_COMPANY_SUFFIXES = frozenset(('LLC', 'INC', 'CORP', 'LTD', 'LP', 'LLP'))
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_WS_RE = re.compile(r'\s+')
+_STATE_RE = re.compile(r'\b([A-Z]{2})\b')
+_ZIP_RE = re.compile(r'\b(\d{5}(?:-\d{4})?)\b')
 
 
 class DataNormalizer:
@@ -59,34 +72,25 @@ class DataNormalizer:
     
     def _deduplicate_brokers(self, brokers: List[Broker]) -> List[Broker]:
         """Deduplicate brokers by MC number and company name"""
-        seen_mc = {}
-        seen_company = {}
-        unique_brokers = []
+        # Dedup key per broker in one pass: MC number (most reliable) when
+        # present, otherwise company name; None if no identifying information
+        keys = [
+            ('mc', self._normalize_mc_id(broker.mc_id)) if broker.mc_id
+            else ('company', self._normalize_company_name(broker.company_name)) if broker.company_name
+            else None
+            for broker in brokers
+        ]
         
-        for broker in brokers:
-            # Skip if no identifying information
-            if not broker.mc_id and not broker.company_name:
+        seen = {}
+        unique_brokers = []
+        for broker, key in zip(brokers, keys):
+            if key is None:
                 continue
-            
-            # Check by MC number (most reliable)
-            if broker.mc_id:
-                normalized_mc = self._normalize_mc_id(broker.mc_id)
-                if normalized_mc in seen_mc:
-                    # Merge with existing broker
-                    existing = seen_mc[normalized_mc]
-                    self._merge_brokers(existing, broker)
-                    continue
-                seen_mc[normalized_mc] = broker
-            
-            # Check by company name (if no MC)
-            elif broker.company_name:
-                normalized_name = self._normalize_company_name(broker.company_name)
-                if normalized_name in seen_company:
-                    existing = seen_company[normalized_name]
-                    self._merge_brokers(existing, broker)
-                    continue
-                seen_company[normalized_name] = broker
-            
+            if key in seen:
+                # Merge with existing broker
+                self._merge_brokers(seen[key], broker)
+                continue
+            seen[key] = broker
             unique_brokers.append(broker)
         
         self.normalization_stats['brokers_deduplicated'] = len(brokers) - len(unique_brokers)
@@ -104,12 +108,14 @@ class DataNormalizer:
             
             if load.load_id:
                 normalized_id = load.load_id.strip().upper()
-                if normalized_id not in seen_loads:
-                    seen_loads[normalized_id] = load
+                # One hash lookup per load: setdefault inserts new IDs and
+                # returns the first load for repeats (the dict grows only for new IDs)
+                seen_count = len(seen_loads)
+                existing = seen_loads.setdefault(normalized_id, load)
+                if len(seen_loads) > seen_count:
                     unique_loads.append(load)
                 else:
                     # Merge load data
-                    existing = seen_loads[normalized_id]
                     self._merge_loads(existing, load)
             else:
                 unique_loads.append(load)
@@ -129,7 +135,7 @@ class DataNormalizer:
             if not origin or not destination:
                 continue
             
-            lane_key = f"{origin}→{destination}"
+            lane_key = (origin, destination)
             
             if lane_key in lane_map:
                 # Merge lane data
@@ -146,65 +152,73 @@ class DataNormalizer:
     
     def _normalize_address(self, address: Address) -> Address:
         """Normalize address format"""
-        if address.raw_address:
+        # Nothing to extract when the parser already filled every component
+        if address.raw_address and not (address.state and address.zip_code and address.city):
             # Try to extract components
             raw = address.raw_address
             
             # Extract state
             if not address.state:
-                state_match = re.search(r'\b([A-Z]{2})\b', raw)
+                state_match = _STATE_RE.search(raw)
                 if state_match:
                     address.state = state_match.group(1)
             
             # Extract ZIP
             if not address.zip_code:
-                zip_match = re.search(r'\b(\d{5}(?:-\d{4})?)\b', raw)
+                zip_match = _ZIP_RE.search(raw)
                 if zip_match:
                     address.zip_code = zip_match.group(1)
             
             # Extract city (text before state)
             if not address.city and address.state:
-                parts = raw.split(address.state)
-                if parts:
-                    city_part = parts[0].strip().rstrip(',').strip()
-                    city_parts = city_part.split(',')
-                    if city_parts:
-                        address.city = city_parts[-1].strip()
+                end = raw.find(address.state)
+                city_part = (raw[:end] if end != -1 else raw).strip().rstrip(',').strip()
+                address.city = city_part.rsplit(',', 1)[-1].strip()
         
         self.normalization_stats['addresses_normalized'] += 1
         return address
     
-    def _normalize_mc_id(self, mc_id: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+    def _normalize_mc_id(mc_id: str) -> str:
         """Normalize MC number"""
         if not mc_id:
             return ""
-        # Remove all non-numeric characters
-        return re.sub(r'[^\d]', '', str(mc_id))
+        # Remove all non-numeric characters (interned: MC numbers repeat across loads)
+        return sys.intern(digits_only(str(mc_id)))
     
-    def _normalize_company_name(self, name: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+    def _normalize_company_name(name: str) -> str:
         """Normalize company name for comparison"""
         if not name:
             return ""
-        # Remove common suffixes and normalize
-        name = name.upper().strip()
-        name = re.sub(r'\s+(LLC|INC|CORP|LTD|LP|LLP)\s*$', '', name)
-        name = re.sub(r'[^\w\s]', '', name)
-        name = re.sub(r'\s+', ' ', name)
-        return name
+        # Split once: strips, collapses whitespace and exposes the suffix word
+        words = name.upper().split()
+        if len(words) > 1 and words[-1] in _COMPANY_SUFFIXES:
+            words.pop()
+        name = ' '.join(words)
+        # Most names have no punctuation; only those need the regex passes
+        if not name.replace(' ', '').isalnum():
+            name = _WS_RE.sub(' ', _PUNCT_RE.sub('', name))
+        return sys.intern(name)
     
-    def _normalize_city_state(self, city_state: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+    def _normalize_city_state(city_state: str) -> str:
         """Normalize city-state string"""
         if not city_state:
             return ""
         # Remove extra whitespace, normalize format
         city_state = city_state.strip()
-        city_state = re.sub(r'\s+', ' ', city_state)
+        city_state = _WS_RE.sub(' ', city_state)
         # Ensure state is uppercase
         parts = city_state.split(',')
         if len(parts) == 2:
             city, state = parts
-            return f"{city.strip()}, {state.strip().upper()}"
-        return city_state
+            city_state = f"{city.strip()}, {state.strip().upper()}"
+        # Interned: the same cities appear on many lanes
+        return sys.intern(city_state)
     
     def _merge_brokers(self, existing: Broker, new: Broker):
         """Merge new broker data into existing broker"""
@@ -264,36 +278,27 @@ class DataNormalizer:
     def _extract_preferences(self, profile: CarrierProfile):
         """Extract carrier preferences from historical data"""
         # Extract preferred lanes (most frequent)
-        lane_counts = defaultdict(int)
-        for lane in profile.lanes:
-            if lane.origin_city_state and lane.destination_city_state:
-                lane_key = f"{lane.origin_city_state}→{lane.destination_city_state}"
-                lane_counts[lane_key] += 1
+        lane_counts = Counter(
+            (lane.origin_city_state, lane.destination_city_state)
+            for lane in profile.lanes
+            if lane.origin_city_state and lane.destination_city_state
+        )
         
-        # Get top 10 lanes
+        # Get top 10 lanes (formatted as "origin→destination" only for the winners)
         profile.preferred_lanes = [
-            lane for lane, _ in sorted(lane_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            f"{origin}→{destination}" for (origin, destination), _ in lane_counts.most_common(10)
         ]
         
         # Extract preferred brokers (most frequent)
-        broker_counts = defaultdict(int)
-        for load in profile.loads:
-            if load.broker and load.broker.mc_id:
-                broker_counts[load.broker.mc_id] += 1
-        
-        profile.preferred_brokers = [
-            mc_id for mc_id, _ in sorted(broker_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        ]
+        broker_counts = Counter(
+            load.broker.mc_id for load in profile.loads
+            if load.broker and load.broker.mc_id
+        )
+        profile.preferred_brokers = [mc_id for mc_id, _ in broker_counts.most_common(10)]
         
         # Extract preferred equipment types
-        equipment_counts = defaultdict(int)
-        for load in profile.loads:
-            if load.equipment_type:
-                equipment_counts[load.equipment_type] += 1
-        
-        profile.preferred_equipment = [
-            eq for eq, _ in sorted(equipment_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        ]
+        equipment_counts = Counter(load.equipment_type for load in profile.loads if load.equipment_type)
+        profile.preferred_equipment = [eq for eq, _ in equipment_counts.most_common(5)]
     
     def get_stats(self) -> Dict[str, int]:
         """Get normalization statistics"""
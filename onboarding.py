@@ -4,11 +4,14 @@ Handles the complete flow: upload → parsing → enrichment → match generatio
 """
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import sys
 import uuid
 from pathlib import Path
 
-from schema import CarrierProfile, DataSource
-from parser.unified_parser import UnifiedParser
+import pandas as pd
+
+from schema import CarrierProfile, DataSource, Address, Broker, Lane, Rate
+from parser.unified_parser import parse_each, parse_or_error
 from normalization import DataNormalizer
 from enrichment import EnrichmentEngine
 from load_matching import LoadMatchingEngine, LoadMatch
@@ -20,7 +23,6 @@ class OnboardingFlow:
     """Complete onboarding flow for carriers"""
     
     def __init__(self, database: Optional[Database] = None):
-        self.parser = UnifiedParser()
         self.normalizer = DataNormalizer()
         self.enrichment_engine = EnrichmentEngine(database)
         self.database = database
@@ -35,11 +37,32 @@ class OnboardingFlow:
             carrier_name: Optional carrier name
             carrier_mc: Optional carrier MC number
             
+        Returns:
+            Dictionary with processing results and carrier profile
+        """
+        # Step 1: Parse files
+        print("Step 1: Parsing files...")
+        partials = parse_files(file_paths)
+        
+        return self.complete_upload(partials, carrier_name, carrier_mc)
+    
+    def complete_upload(self, partials: List[Dict[str, Any]], carrier_name: Optional[str] = None,
+                        carrier_mc: Optional[str] = None,
+                        carrier_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Finish onboarding from per-file parse results: normalize → enrich → save
+        
+        Args:
+            partials: Results of parse_files (or parse_one_file per file)
+            carrier_name: Optional carrier name
+            carrier_mc: Optional carrier MC number
+            carrier_id: Optional carrier ID (generated if not provided)
+            
         Returns:
             Dictionary with processing results and carrier profile
         """
         results = {
-            'carrier_id': str(uuid.uuid4()),
+            'carrier_id': carrier_id or str(uuid.uuid4()),
             'files_processed': [],
             'errors': [],
             'warnings': [],
@@ -47,22 +70,19 @@ class OnboardingFlow:
             'profile': None
         }
         
-        # Step 1: Parse files
-        print("Step 1: Parsing files...")
-        try:
-            if len(file_paths) == 1:
-                profile = self.parser.parse_file(file_paths[0])
-            else:
-                profile = self.parser.parse_multiple_files(file_paths)
-            
-            results['files_processed'] = file_paths
-            results['stats']['parsed_brokers'] = len(profile.brokers)
-            results['stats']['parsed_loads'] = len(profile.loads)
-            results['stats']['parsed_lanes'] = len(profile.lanes)
-            
-        except Exception as e:
-            results['errors'].append(f"Parsing error: {str(e)}")
+        failed = [partial for partial in partials if partial['error']]
+        if failed and len(failed) == len(partials):
+            for partial in failed:
+                results['errors'].append(f"Parsing error: {partial['error']}")
             return results
+        for partial in failed:
+            results['warnings'].append(f"Could not parse {partial['file_path']}: {partial['error']}")
+        
+        profile = merge_results(partials)
+        results['files_processed'] = [partial['file_path'] for partial in partials]
+        results['stats']['parsed_brokers'] = len(profile.brokers)
+        results['stats']['parsed_loads'] = len(profile.loads)
+        results['stats']['parsed_lanes'] = len(profile.lanes)
         
         # Set carrier information
         profile.carrier_name = carrier_name
@@ -133,24 +153,145 @@ class OnboardingFlow:
         Returns:
             Dictionary with matches and summary
         """
+        matching_engine = self._matching_engine(carrier_id)
+        matches = matching_engine.match_loads_batch(available_loads, limit)
+        return self._match_results(carrier_id, matching_engine, matches)
+    
+    def generate_matches_from_df(self, carrier_id: str, loads_df: pd.DataFrame,
+                                 limit: int = 10) -> Dict[str, Any]:
+        """
+        Generate load matches for a carrier from a DataFrame of loads.
+        
+        Args:
+            carrier_id: Carrier ID
+            loads_df: Available loads, as built by load_matching.loads_to_frame
+            limit: Maximum number of matches
+            
+        Returns:
+            Dictionary with matches and summary
+        """
+        matching_engine = self._matching_engine(carrier_id)
+        matches = matching_engine.match_from_df(loads_df, limit)
+        return self._match_results(carrier_id, matching_engine, matches)
+    
+    def _matching_engine(self, carrier_id: str) -> LoadMatchingEngine:
+        """Create a matching engine for a stored carrier"""
         # Load carrier profile from database
         if not self.database:
             raise ValueError("Database required for match generation")
         
-        # For now, we'll need to reconstruct profile from database
-        # In production, this would be a proper query
+        # History (loads with broker, lane and rate) is eager-loaded in one query per relationship
         profile = self.database.get_carrier_profile(carrier_id)
         
         if not profile:
             raise ValueError(f"Carrier profile not found: {carrier_id}")
         
-        # Create matching engine
-        # Note: This is simplified - in production, reconstruct full profile
-        carrier_profile = CarrierProfile(carrier_id=carrier_id)
-        # ... reconstruct from database ...
+        # Score against a plain-Python snapshot so matching never touches the ORM
+        return LoadMatchingEngine(self._profile_from_model(profile))
+    
+    @staticmethod
+    def _profile_from_model(profile) -> CarrierProfile:
+        """Rebuild a CarrierProfile from a stored carrier and its eager-loaded history"""
+        def address(data):
+            return Address(**data) if data else None
+        
+        def label(value):
+            # Low-cardinality columns (status, currency, ...): each row
+            # otherwise brings its own copy of the same few strings
+            return sys.intern(value) if value else value
+        
+        def broker(broker_model):
+            if broker_model is None:
+                return None
+            return Broker(
+                broker_id=broker_model.broker_id,
+                broker_name=broker_model.broker_name,
+                company_name=broker_model.company_name,
+                mc_id=broker_model.mc_id,
+                broker_phone_number=broker_model.broker_phone_number,
+                broker_email=broker_model.broker_email,
+                company_address=address(broker_model.company_address),
+                date_of_contract=broker_model.date_of_contract,
+                load_board=label(broker_model.load_board),
+                notes=broker_model.notes,
+                source=broker_model.source or DataSource.MANUAL,
+                created_at=broker_model.created_at,
+                updated_at=broker_model.updated_at
+            )
+        
+        def lane(lane_model):
+            if lane_model is None:
+                return None
+            return Lane(
+                lane_id=lane_model.lane_id,
+                origin=address(lane_model.origin_address),
+                destination=address(lane_model.destination_address),
+                origin_city_state=lane_model.origin_city_state,
+                destination_city_state=lane_model.destination_city_state,
+                distance_miles=lane_model.distance_miles,
+                estimated_duration_hours=lane_model.estimated_duration_hours,
+                source=lane_model.source or DataSource.MANUAL,
+                created_at=lane_model.created_at
+            )
+        
+        def rate(rate_model):
+            if rate_model is None:
+                return None
+            return Rate(
+                rate_id=rate_model.rate_id,
+                load_id=rate_model.load_id,
+                rate_amount=rate_model.rate_amount,
+                rate_per_mile=rate_model.rate_per_mile,
+                currency=label(rate_model.currency) or 'USD',
+                rate_type=label(rate_model.rate_type),
+                source=rate_model.source or DataSource.MANUAL,
+                enrichment_source=rate_model.enrichment_source,
+                created_at=rate_model.created_at
+            )
+        
+        loads = [
+            Load(
+                load_id=load_model.load_id,
+                broker_id=load_model.broker_id,
+                broker=broker(load_model.broker),
+                lane=lane(load_model.lane),
+                rate=rate(load_model.rate),
+                pickup_date=load_model.pickup_date,
+                delivery_date=load_model.delivery_date,
+                equipment_type=label(load_model.equipment_type),
+                weight=load_model.weight,
+                pallets=load_model.pallets,
+                pieces=load_model.pieces,
+                status=label(load_model.status),
+                booking_date=load_model.booking_date,
+                notes=load_model.notes,
+                load_board=label(load_model.load_board),
+                source=load_model.source or DataSource.MANUAL,
+                raw_data=load_model.raw_data,
+                created_at=load_model.created_at,
+                updated_at=load_model.updated_at
+            )
+            for load_model in profile.loads
+        ]
         
-        matching_engine = LoadMatchingEngine(carrier_profile)
-        matches = matching_engine.match_loads(available_loads, limit)
+        return CarrierProfile(
+            carrier_id=profile.carrier_id,
+            carrier_name=profile.carrier_name,
+            mc_number=profile.mc_number,
+            brokers=[broker(broker_model) for broker_model in profile.brokers],
+            loads=loads,
+            lanes=[lane(lane_model) for lane_model in profile.lanes],
+            preferred_lanes=list(profile.preferred_lanes or []),
+            preferred_equipment=list(profile.preferred_equipment or []),
+            preferred_brokers=list(profile.preferred_brokers or []),
+            created_at=profile.created_at,
+            updated_at=profile.updated_at
+        )
+    
+    @staticmethod
+    def _match_results(carrier_id: str, matching_engine: LoadMatchingEngine,
+                       matches: List[LoadMatch]) -> Dict[str, Any]:
+        """Build the match response for a carrier"""
         summary = matching_engine.get_match_summary(matches)
         
         return {
@@ -193,3 +334,59 @@ class OnboardingFlow:
             'carrier_id': carrier_id
         }
 
+
+def parse_one_file(file_path: str) -> Dict[str, Any]:
+    """
+    Parse a single uploaded file with a fresh parser.
+    
+    Args:
+        file_path: Path to the file to parse
+        
+    Returns:
+        Partial result with the file path, parsed profile and any error
+    """
+    return _partial_result(file_path, parse_or_error(file_path))
+
+
+def parse_files(file_paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Parse uploaded files, in worker processes when there is more than one.
+    
+    Args:
+        file_paths: Paths of the files to parse
+        
+    Returns:
+        Results of parse_one_file, in the order of file_paths
+    """
+    return [
+        _partial_result(file_path, result)
+        for file_path, result in zip(file_paths, parse_each(file_paths))
+    ]
+
+
+def _partial_result(file_path: str, result) -> Dict[str, Any]:
+    """Partial result for a parsed CarrierProfile or the exception parsing raised"""
+    if isinstance(result, Exception):
+        return {'file_path': file_path, 'profile': None, 'error': str(result)}
+    return {'file_path': file_path, 'profile': result, 'error': None}
+
+
+def merge_results(partials: List[Dict[str, Any]]) -> CarrierProfile:
+    """
+    Merge per-file parse results into a single CarrierProfile.
+    
+    Args:
+        partials: Results of parse_files or parse_one_file
+        
+    Returns:
+        CarrierProfile containing the brokers, loads and lanes of every parsed file
+    """
+    merged_profile = CarrierProfile(created_at=datetime.now())
+    for partial in partials:
+        profile = partial['profile']
+        if profile is None:
+            continue
+        merged_profile.brokers.extend(profile.brokers)
+        merged_profile.loads.extend(profile.loads)
+        merged_profile.lanes.extend(profile.lanes)
+    return merged_profile
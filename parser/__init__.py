@@ -1,11 +1,18 @@
 """
 Parser package for carrier data processing.
+Parser classes are imported on first access, so using one format's parser
+does not load the libraries the others need.
 """
-from parser.unified_parser import UnifiedParser
-from parser.csv_parser import CSVParser
-from parser.excel_parser import ExcelParser
-from parser.pdf_parser import PDFParser
-from parser.email_parser import EmailParser
+from importlib import import_module
+
+# Exported name -> defining module
+_EXPORTS = {
+    'UnifiedParser': 'parser.unified_parser',
+    'CSVParser': 'parser.csv_parser',
+    'ExcelParser': 'parser.excel_parser',
+    'PDFParser': 'parser.pdf_parser',
+    'EmailParser': 'parser.email_parser',
+}
 
 __all__ = [
     'UnifiedParser',
@@ -15,3 +22,8 @@ __all__ = [
     'EmailParser'
 ]
 
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,15 +3,68 @@ Enhanced CSV parser for carrier data.
 Extends the original broker parser to handle loads, rates, and addresses.
 """
 import csv
+import dataclasses
+import io
 import re
-from typing import List, Optional, Dict, Any
+import sys
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from datetime import datetime
 from pathlib import Path
 
+import pandas as pd
+
 from schema import (
     Broker, Load, Lane, Rate, Address, CarrierProfile,
     DataSource
 )
+from parser.utils import digits_only, extract_rate_from_text, parse_date, parse_trip
+
+# Compiled once; these run for every row
+_STATE_RE = re.compile(r'\b([A-Z]{2})\b')
+_ZIP_RE = re.compile(r'\b(\d{5}(?:-\d{4})?)\b')
+
+
+# CSV column -> Broker field
+BROKER_COLUMN_MAPPING = {
+    'Name': 'broker_name',
+    'Broker': 'company_name',
+    'MC#': 'mc_id',
+    'Phone Number': 'broker_phone_number',
+    'Email': 'broker_email',
+    'Address': 'company_address',
+    'Date': 'date_of_contract',
+    'Load #': 'load_id',
+    # 'State' is not part of Broker schema - state info is in address
+    'Trip': 'source_destination',
+    'Notes': 'notes',
+    'Load Board': 'load_board'
+}
+
+# Mapped columns with no Broker field ('Load #', 'Trip') are read elsewhere;
+# Broker uses slots, so only declared fields can be set on it
+_BROKER_FIELDS = frozenset(f.name for f in dataclasses.fields(Broker))
+
+# Rows tokenized per pandas chunk in parse_file
+CSV_CHUNK_ROWS = 10000
+
+# Cell values treated as empty
+_MISSING_VALUES = frozenset(('N/L', 'N/A', ''))
+
+
+class _RowView:
+    """Header -> value lookups on a raw CSV row (values stripped, blanks as None)"""
+    __slots__ = ('row', 'column_index')
+    
+    def __init__(self, row: List[str], column_index: Dict[str, int]):
+        self.row = row
+        self.column_index = column_index
+    
+    def get(self, header: str, default: Any = None) -> Any:
+        i = self.column_index.get(header)
+        if i is None or i >= len(self.row):
+            return default
+        value = self.row[i]
+        return value.strip() if value else None
 
 
 class CSVParser:
@@ -22,6 +75,10 @@ class CSVParser:
         self.loads: List[Load] = []
         self.lanes: List[Lane] = []
         self.rates: List[Rate] = []
+        # Timestamp stamped on every object from one parse (set per parse_rows call)
+        self._parsed_at: Optional[datetime] = None
+        # (column position, Broker attribute) for the mapped columns of the current header
+        self._broker_columns: List[Tuple[int, str]] = []
     
     def parse_file(self, file_path: str) -> CarrierProfile:
         """
@@ -33,9 +90,19 @@ class CSVParser:
         Returns:
             CarrierProfile with parsed data
         """
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-            return self.parse_content(content, source_file=file_path)
+        # Tokenize in C with pandas (all cells as raw strings, no NA inference),
+        # CSV_CHUNK_ROWS rows at a time so the whole file is never held in memory;
+        # files pandas can't tokenize (e.g. ragged rows) are streamed through csv.reader
+        try:
+            with pd.read_csv(file_path, header=None, dtype=str, na_filter=False,
+                             encoding='utf-8', chunksize=CSV_CHUNK_ROWS) as chunks:
+                rows = (row for chunk in chunks for row in chunk.itertuples(index=False, name=None))
+                return self.parse_rows(rows, source_file=file_path)
+        except pd.errors.EmptyDataError:
+            return self.parse_rows([], source_file=file_path)
+        except pd.errors.ParserError:
+            with open(file_path, 'r', encoding='utf-8', newline='') as file:
+                return self.parse_rows(csv.reader(file), source_file=file_path)
     
     def parse_content(self, content: str, source_file: Optional[str] = None) -> CarrierProfile:
         """
@@ -45,6 +112,19 @@ class CSVParser:
             content: Raw CSV content as string
             source_file: Optional source file path for metadata
             
+        Returns:
+            CarrierProfile with parsed data
+        """
+        return self.parse_rows(csv.reader(io.StringIO(content.strip())), source_file=source_file)
+    
+    def parse_rows(self, rows: Iterable[List[str]], source_file: Optional[str] = None) -> CarrierProfile:
+        """
+        Parse CSV rows (header row first) into structured data.
+        
+        Args:
+            rows: Iterable of CSV rows, e.g. a csv.reader
+            source_file: Optional source file path for metadata
+            
         Returns:
             CarrierProfile with parsed data
         """
@@ -52,42 +132,48 @@ class CSVParser:
         self.loads = []
         self.lanes = []
         self.rates = []
+        self._parsed_at = datetime.now()
         
-        lines = content.strip().split('\n')
-        reader = csv.reader(lines)
-        rows = list(reader)
-        
-        if not rows:
+        rows = iter(rows)
+        # Header is the first non-blank row
+        headers = next((row for row in rows if row and any(row)), None)
+        if headers is None:
             return CarrierProfile()
         
-        headers = [h.strip() for h in rows[0]]
+        headers = [h.strip() for h in headers]
         print(f"Found {len(headers)} columns: {headers}")
-        print(f"Processing {len(rows) - 1} data rows...\n")
+        # Header -> column position, built once (later duplicates win, as before)
+        column_index = {header: i for i, header in enumerate(headers)}
+        self._broker_columns = [
+            (column_index[csv_col], attr_name)
+            for csv_col, attr_name in BROKER_COLUMN_MAPPING.items()
+            if csv_col in column_index and attr_name in _BROKER_FIELDS
+        ]
         
         # Process each data row
-        for row_num, row in enumerate(rows[1:], start=2):
+        row_count = 0
+        for row_num, row in enumerate(rows, start=2):
+            row_count += 1
             if not row or not any(row):
                 continue
             
-            self._parse_row(row, headers, row_num)
+            self._parse_row(row, column_index, row_num)
+        print(f"Processed {row_count} data rows\n")
         
         # Build carrier profile
         profile = CarrierProfile(
             brokers=self.brokers,
             loads=self.loads,
             lanes=self.lanes,
-            created_at=datetime.now()
+            created_at=self._parsed_at
         )
         
         return profile
     
-    def _parse_row(self, row: List[str], headers: List[str], row_num: int):
+    def _parse_row(self, row: List[str], column_index: Dict[str, int], row_num: int):
         """Parse a single CSV row into structured objects"""
-        # Map headers to values
-        row_data = {}
-        for i, header in enumerate(headers):
-            if i < len(row):
-                row_data[header] = row[i].strip() if row[i] else None
+        # Look values up by header on demand instead of building a dict per row
+        row_data = _RowView(row, column_index)
         
         # Create broker
         broker = self._create_broker(row_data, row_num)
@@ -111,29 +197,17 @@ class CSVParser:
             if load:
                 load.rate = rate
     
-    def _create_broker(self, row_data: Dict[str, Any], row_num: int) -> Optional[Broker]:
+    def _create_broker(self, row_data: _RowView, row_num: int) -> Optional[Broker]:
         """Create a Broker object from row data"""
-        broker = Broker(source=DataSource.CSV, created_at=datetime.now())
-        
-        # Map CSV columns to broker fields
-        column_mapping = {
-            'Name': 'broker_name',
-            'Broker': 'company_name',
-            'MC#': 'mc_id',
-            'Phone Number': 'broker_phone_number',
-            'Email': 'broker_email',
-            'Address': 'company_address',
-            'Date': 'date_of_contract',
-            'Load #': 'load_id',
-            # 'State' is not part of Broker schema - state info is in address
-            'Trip': 'source_destination',
-            'Notes': 'notes',
-            'Load Board': 'load_board'
-        }
-        
-        for csv_col, attr_name in column_mapping.items():
-            value = row_data.get(csv_col)
-            if value and value not in ['N/L', 'N/A', '']:
+        broker = Broker(source=DataSource.CSV, created_at=self._parsed_at or datetime.now())
+        
+        # Map CSV columns to broker fields (positions resolved once per header)
+        row = row_data.row
+        for i, attr_name in self._broker_columns:
+            if i >= len(row) or not row[i]:
+                continue
+            value = row[i].strip()
+            if value and value not in _MISSING_VALUES:
                 if attr_name == 'company_address':
                     # Parse address
                     broker.company_address = self._parse_address(value)
@@ -141,7 +215,7 @@ class CSVParser:
                     broker.date_of_contract = self._parse_date(value)
                 elif attr_name == 'mc_id':
                     # Clean MC number
-                    broker.mc_id = re.sub(r'[^\d]', '', value)
+                    broker.mc_id = digits_only(value)
                 else:
                     setattr(broker, attr_name, value)
         
@@ -150,14 +224,17 @@ class CSVParser:
         
         return broker if broker.company_name or broker.broker_name else None
     
-    def _create_lane(self, row_data: Dict[str, Any], row_num: int) -> Optional[Lane]:
+    def _create_lane(self, row_data: _RowView, row_num: int) -> Optional[Lane]:
         """Create a Lane object from row data"""
         trip = row_data.get('Trip') or row_data.get('source_destination')
         if not trip:
             return None
         
-        lane = Lane(source=DataSource.CSV, created_at=datetime.now())
-        lane.origin_city_state, lane.destination_city_state = self._parse_trip(trip)
+        lane = Lane(source=DataSource.CSV, created_at=self._parsed_at or datetime.now())
+        origin, destination = self._parse_trip(trip)
+        # Interned: the same cities repeat across many rows
+        lane.origin_city_state = sys.intern(origin) if origin else origin
+        lane.destination_city_state = sys.intern(destination) if destination else destination
         
         # Try to extract addresses if available
         if lane.origin_city_state:
@@ -167,7 +244,7 @@ class CSVParser:
         
         return lane
     
-    def _create_load(self, row_data: Dict[str, Any], broker: Optional[Broker], 
+    def _create_load(self, row_data: _RowView, broker: Optional[Broker], 
                     lane: Optional[Lane], row_num: int) -> Optional[Load]:
         """Create a Load object from row data"""
         load_id = row_data.get('Load #') or row_data.get('Load #')
@@ -180,22 +257,26 @@ class CSVParser:
             broker_id=broker.mc_id if broker else None,
             lane=lane,
             source=DataSource.CSV,
-            created_at=datetime.now()
+            created_at=self._parsed_at or datetime.now()
         )
         
-        # Parse dates
+        # Parse dates (the broker already parsed this row's Date as its contract date)
         date_str = row_data.get('Date')
         if date_str:
-            load.booking_date = self._parse_date(date_str)
+            if broker is not None and date_str not in _MISSING_VALUES:
+                load.booking_date = broker.date_of_contract
+            else:
+                load.booking_date = self._parse_date(date_str)
             load.pickup_date = load.booking_date  # Default to booking date
         
         load.notes = row_data.get('Notes')
-        load.load_board = row_data.get('Load Board')
+        load_board = row_data.get('Load Board')
+        load.load_board = sys.intern(load_board) if load_board else None
         load.status = 'booked'  # Default status
         
         return load
     
-    def _create_rate(self, row_data: Dict[str, Any], load: Optional[Load], 
+    def _create_rate(self, row_data: _RowView, load: Optional[Load], 
                     row_num: int) -> Optional[Rate]:
         """Create a Rate object from row data"""
         # Try to extract rate from notes or other fields
@@ -204,7 +285,6 @@ class CSVParser:
         # Look for rate patterns in notes (only if notes is not empty)
         rate_amount = None
         if notes:
-            from parser.utils import extract_rate_from_text
             rate_amount = extract_rate_from_text(notes)
         
         # Only create rate if we found an amount or have a load
@@ -214,7 +294,7 @@ class CSVParser:
         rate = Rate(
             load_id=load.load_id if load else None,
             source=DataSource.CSV,
-            created_at=datetime.now()
+            created_at=self._parsed_at or datetime.now()
         )
         
         if rate_amount:
@@ -231,35 +311,30 @@ class CSVParser:
         address = Address(raw_address=address_str)
         
         # Try to extract state (2-letter code)
-        state_match = re.search(r'\b([A-Z]{2})\b', address_str)
+        state_match = _STATE_RE.search(address_str)
         if state_match:
             address.state = state_match.group(1)
         
         # Try to extract ZIP code
-        zip_match = re.search(r'\b(\d{5}(?:-\d{4})?)\b', address_str)
+        zip_match = _ZIP_RE.search(address_str)
         if zip_match:
             address.zip_code = zip_match.group(1)
         
         # Simple city extraction (text before state)
         if address.state:
-            parts = address_str.split(address.state)
-            if parts:
-                city_part = parts[0].strip().rstrip(',').strip()
-                # Take last part as city (usually city name)
-                city_parts = city_part.split(',')
-                if city_parts:
-                    address.city = city_parts[-1].strip()
+            end = address_str.find(address.state)
+            city_part = (address_str[:end] if end != -1 else address_str).strip().rstrip(',').strip()
+            # Take last part as city (usually city name)
+            address.city = city_part.rsplit(',', 1)[-1].strip()
         
         return address
     
     def _parse_trip(self, trip_str: str) -> tuple:
         """Parse trip string into origin and destination"""
-        from parser.utils import parse_trip
         return parse_trip(trip_str)
     
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """Parse date string into datetime object"""
-        from parser.utils import parse_date
         return parse_date(date_str)
     
     def _clean_broker_data(self, broker: Broker):
@@ -270,9 +345,6 @@ class CSVParser:
         if broker.broker_name:
             broker.broker_name = broker.broker_name.replace('**', '').strip()
         
-        if broker.mc_id:
-            broker.mc_id = re.sub(r'[^\d]', '', broker.mc_id)
-        
         if broker.broker_phone_number:
             broker.broker_phone_number = broker.broker_phone_number.strip()
 
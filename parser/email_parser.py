@@ -3,6 +3,7 @@ Email parser for booking confirmations.
 Extracts structured data from email text using regex and NLP.
 """
 import re
+import sys
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -11,6 +12,138 @@ from schema import (
     DataSource
 )
 from parser.csv_parser import CSVParser
+from parser.utils import parse_date
+
+try:
+    # The regex package (V0: re-compatible behaviour) runs most of these patterns
+    # faster than re; fall back to re when it is not installed
+    import regex as fast_re
+    _FAST_FLAGS = fast_re.IGNORECASE | fast_re.V0
+except ImportError:
+    fast_re = re
+    _FAST_FLAGS = re.IGNORECASE
+
+
+def _compile_all(*patterns: str, engine=fast_re) -> tuple:
+    """Compile case-insensitive patterns once, in priority order"""
+    flags = _FAST_FLAGS if engine is fast_re else re.IGNORECASE
+    return tuple(engine.compile(pattern, flags) for pattern in patterns)
+
+
+def _mentions(folded: str, keywords: tuple) -> bool:
+    """Whether any keyword occurs in the case-folded text"""
+    return any(keyword in folded for keyword in keywords)
+
+
+def _first_match(patterns: tuple, keywords: tuple, text: str, folded: str):
+    """
+    First match of the highest-priority pattern that matches text.
+    
+    Every pattern in a group contains one of its keywords literally, so the
+    regex scans are skipped when none of them occur in the folded text.
+    """
+    if not _mentions(folded, keywords):
+        return None
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match
+    return None
+
+
+# str.lower() misses the non-ASCII letters that re.IGNORECASE matches to
+# ASCII ones (dotted/dotless I, long S), so map those first
+_CASE_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's'})
+
+# Extraction patterns, each group tried in order (first match wins), with the
+# keywords at least one of which a match must contain
+
+# Broker company name
+_COMPANY_RES = _compile_all(
+    r'(?:from|broker|carrier)[:\s]+([A-Z][A-Za-z\s&,\.]+(?:LLC|Inc|Corp|Ltd)?)',
+    # Anchored at the start of a run of name characters: a later start in the
+    # same run can never match when the first one fails, and trying every
+    # offset made long suffix-less emails quadratic
+    r'(?<![A-Za-z\s&,\.])[\s&,\.]*([A-Z][A-Za-z\s&,\.]+(?:LLC|Inc|Corp|Ltd))',
+    engine=re,  # re is faster than regex on these two
+)
+_COMPANY_KEYWORDS = ('from', 'broker', 'carrier', 'llc', 'inc', 'corp', 'ltd')
+
+# MC number
+_MC_RES = _compile_all(
+    r'MC[#:\s]*(\d+)',
+    r'MC\s*Number[:\s]*(\d+)',
+    r'Motor\s*Carrier[#:\s]*(\d+)',
+)
+_MC_KEYWORDS = ('mc', 'motor')
+
+# Load ID
+_LOAD_ID_RES = _compile_all(
+    r'Load[#:\s]+([A-Z0-9\-]+)',
+    r'Booking[#:\s]+([A-Z0-9\-]+)',
+    r'Pro[#:\s]+([A-Z0-9\-]+)',
+    r'Reference[#:\s]+([A-Z0-9\-]+)',
+    r'Order[#:\s]+([A-Z0-9\-]+)',
+)
+_LOAD_ID_KEYWORDS = ('load', 'booking', 'pro', 'reference', 'order')
+
+# Origin
+_ORIGIN_RES = _compile_all(
+    r'Origin[:\s]+(.+?)(?:\n|Destination|Delivery|To|$)',
+    r'Pickup[:\s]+(.+?)(?:\n|Delivery|To|$)',
+    r'From[:\s]+(.+?)(?:\n|To|Destination|$)',
+    r'Pickup\s*Location[:\s]+([^\n]+)',
+)
+_ORIGIN_KEYWORDS = ('origin', 'pickup', 'from')
+
+# Destination
+_DESTINATION_RES = _compile_all(
+    r'Destination[:\s]+([^\n]+)',
+    r'Delivery[:\s]+([^\n]+)',
+    r'To[:\s]+(.+?)(?:\n|Origin|From|$)',
+    r'Delivery\s*Location[:\s]+([^\n]+)',
+)
+_DESTINATION_KEYWORDS = ('destination', 'delivery', 'to')
+
+# Rate
+_RATE_RES = _compile_all(
+    r'Rate[:\s]+\$?([\d,]+\.?\d*)',
+    r'Amount[:\s]+\$?([\d,]+\.?\d*)',
+    r'Total[:\s]+\$?([\d,]+\.?\d*)',
+    r'\$([\d,]+\.?\d*)\s*(?:Total|Rate|Amount|Payment)',
+    r'Payment[:\s]+\$?([\d,]+\.?\d*)',
+)
+_RATE_KEYWORDS = ('rate', 'amount', 'total', '$', 'payment')
+
+# Dates
+_DATE_RES = _compile_all(
+    r'Pickup\s*Date[:\s]+([^\n]+)',
+    r'Delivery\s*Date[:\s]+([^\n]+)',
+    r'Booking\s*Date[:\s]+([^\n]+)',
+    r'Date[:\s]+([^\n]+)',
+)
+_DATE_KEYWORDS = ('date',)
+
+# Equipment type
+_EQUIPMENT_RES = _compile_all(
+    r'Equipment[:\s]+([^\n]+)',
+    r'Trailer\s*Type[:\s]+([^\n]+)',
+    r'Type[:\s]+([^\n]+)',
+)
+_EQUIPMENT_KEYWORDS = ('equipment', 'type')
+
+# Equipment keyword -> normalized type, checked in order (first hit wins);
+# 'flat' also covers 'flatbed'
+_EQUIPMENT_TYPES = (
+    ('dry', 'Dry Van'),
+    ('van', 'Dry Van'),
+    ('reefer', 'Refrigerated'),
+    ('refrigerated', 'Refrigerated'),
+    ('flat', 'Flatbed'),
+)
+
+# Trailing "City"/"State"/"Zip" labels left on extracted locations
+_LOCATION_SUFFIX_RE = fast_re.compile(r'\s*(City|State|Zip).*$', _FAST_FLAGS)
 
 
 class EmailParser(CSVParser):
@@ -31,6 +164,7 @@ class EmailParser(CSVParser):
         loads = []
         lanes = []
         rates = []
+        self._parsed_at = datetime.now()
         
         # Combine subject and body
         full_text = f"{subject or ''}\n{email_text}"
@@ -75,7 +209,7 @@ class EmailParser(CSVParser):
             brokers=brokers,
             loads=loads,
             lanes=lanes,
-            created_at=datetime.now()
+            created_at=self._parsed_at
         )
     
     def _extract_from_email(self, text: str) -> Dict[str, Any]:
@@ -87,134 +221,82 @@ class EmailParser(CSVParser):
             'rate': {}
         }
         
+        # Lowercased copy for the cheap keyword checks that gate each regex scan
+        folded = text.translate(_CASE_FOLD).lower()
+        
         # Extract broker company name
-        company_patterns = [
-            r'(?:from|broker|carrier)[:\s]+([A-Z][A-Za-z\s&,\.]+(?:LLC|Inc|Corp|Ltd)?)',
-            r'([A-Z][A-Za-z\s&,\.]+(?:LLC|Inc|Corp|Ltd))',
-        ]
-        for pattern in company_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                extracted['broker']['company_name'] = match.group(1).strip()
-                break
+        match = _first_match(_COMPANY_RES, _COMPANY_KEYWORDS, text, folded)
+        if match:
+            extracted['broker']['company_name'] = match.group(1).strip()
         
         # Extract MC number
-        mc_patterns = [
-            r'MC[#:\s]*(\d+)',
-            r'MC\s*Number[:\s]*(\d+)',
-            r'Motor\s*Carrier[#:\s]*(\d+)',
-        ]
-        for pattern in mc_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                extracted['broker']['mc_id'] = match.group(1)
-                break
+        match = _first_match(_MC_RES, _MC_KEYWORDS, text, folded)
+        if match:
+            extracted['broker']['mc_id'] = match.group(1)
         
         # Extract load ID
-        load_id_patterns = [
-            r'Load[#:\s]+([A-Z0-9\-]+)',
-            r'Booking[#:\s]+([A-Z0-9\-]+)',
-            r'Pro[#:\s]+([A-Z0-9\-]+)',
-            r'Reference[#:\s]+([A-Z0-9\-]+)',
-            r'Order[#:\s]+([A-Z0-9\-]+)',
-        ]
-        for pattern in load_id_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                extracted['load']['load_id'] = match.group(1).strip()
-                break
+        match = _first_match(_LOAD_ID_RES, _LOAD_ID_KEYWORDS, text, folded)
+        if match:
+            extracted['load']['load_id'] = match.group(1).strip()
         
         # Extract origin
-        origin_patterns = [
-            r'Origin[:\s]+(.+?)(?:\n|Destination|Delivery|To|$)',
-            r'Pickup[:\s]+(.+?)(?:\n|Delivery|To|$)',
-            r'From[:\s]+(.+?)(?:\n|To|Destination|$)',
-            r'Pickup\s*Location[:\s]+(.+?)(?:\n|$)',
-        ]
-        for pattern in origin_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                origin = match.group(1).strip()
-                # Clean up common suffixes
-                origin = re.sub(r'\s*(City|State|Zip).*$', '', origin, flags=re.IGNORECASE)
-                extracted['lane']['origin'] = origin
-                break
+        match = _first_match(_ORIGIN_RES, _ORIGIN_KEYWORDS, text, folded)
+        if match:
+            origin = match.group(1).strip()
+            # Clean up common suffixes
+            origin = _LOCATION_SUFFIX_RE.sub('', origin)
+            extracted['lane']['origin'] = origin
         
         # Extract destination
-        destination_patterns = [
-            r'Destination[:\s]+(.+?)(?:\n|$)',
-            r'Delivery[:\s]+(.+?)(?:\n|$)',
-            r'To[:\s]+(.+?)(?:\n|Origin|From|$)',
-            r'Delivery\s*Location[:\s]+(.+?)(?:\n|$)',
-        ]
-        for pattern in destination_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                destination = match.group(1).strip()
-                destination = re.sub(r'\s*(City|State|Zip).*$', '', destination, flags=re.IGNORECASE)
-                extracted['lane']['destination'] = destination
-                break
+        match = _first_match(_DESTINATION_RES, _DESTINATION_KEYWORDS, text, folded)
+        if match:
+            destination = match.group(1).strip()
+            destination = _LOCATION_SUFFIX_RE.sub('', destination)
+            extracted['lane']['destination'] = destination
+        
+        # Rate, dates and equipment only describe a load; without a load ID
+        # parse_email_text creates no load to attach them to
+        if 'load_id' not in extracted['load']:
+            return extracted
         
         # Extract rate
-        rate_patterns = [
-            r'Rate[:\s]+\$?([\d,]+\.?\d*)',
-            r'Amount[:\s]+\$?([\d,]+\.?\d*)',
-            r'Total[:\s]+\$?([\d,]+\.?\d*)',
-            r'\$([\d,]+\.?\d*)\s*(?:Total|Rate|Amount|Payment)',
-            r'Payment[:\s]+\$?([\d,]+\.?\d*)',
-        ]
-        for pattern in rate_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                rate_str = match.group(1).replace(',', '')
-                try:
-                    extracted['rate']['amount'] = float(rate_str)
-                except ValueError:
-                    pass
-                break
+        match = _first_match(_RATE_RES, _RATE_KEYWORDS, text, folded)
+        if match:
+            rate_str = match.group(1).replace(',', '')
+            try:
+                extracted['rate']['amount'] = float(rate_str)
+            except ValueError:
+                pass
         
         # Extract dates
-        date_patterns = [
-            r'Pickup\s*Date[:\s]+(.+?)(?:\n|$)',
-            r'Delivery\s*Date[:\s]+(.+?)(?:\n|$)',
-            r'Booking\s*Date[:\s]+(.+?)(?:\n|$)',
-            r'Date[:\s]+(.+?)(?:\n|$)',
-        ]
-        for pattern in date_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                date_str = match.group(1).strip()
-                if 'pickup' in match.group(0).lower():
-                    extracted['load']['pickup_date'] = date_str
-                elif 'delivery' in match.group(0).lower():
-                    extracted['load']['delivery_date'] = date_str
-                elif 'booking' in match.group(0).lower():
-                    extracted['load']['booking_date'] = date_str
-                else:
-                    if 'pickup_date' not in extracted['load']:
+        if _mentions(folded, _DATE_KEYWORDS):
+            for pattern in _DATE_RES:
+                matches = pattern.finditer(text)
+                for match in matches:
+                    date_str = match.group(1).strip()
+                    if 'pickup' in match.group(0).lower():
                         extracted['load']['pickup_date'] = date_str
+                    elif 'delivery' in match.group(0).lower():
+                        extracted['load']['delivery_date'] = date_str
+                    elif 'booking' in match.group(0).lower():
+                        extracted['load']['booking_date'] = date_str
+                    else:
+                        if 'pickup_date' not in extracted['load']:
+                            extracted['load']['pickup_date'] = date_str
         
         # Extract equipment type
-        equipment_patterns = [
-            r'Equipment[:\s]+(.+?)(?:\n|$)',
-            r'Trailer\s*Type[:\s]+(.+?)(?:\n|$)',
-            r'Type[:\s]+(.+?)(?:\n|$)',
-        ]
-        for pattern in equipment_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                equipment = match.group(1).strip()
-                # Normalize common equipment types
-                equipment = equipment.lower()
-                if 'dry' in equipment or 'van' in equipment:
-                    extracted['load']['equipment_type'] = 'Dry Van'
-                elif 'reefer' in equipment or 'refrigerated' in equipment:
-                    extracted['load']['equipment_type'] = 'Refrigerated'
-                elif 'flatbed' in equipment or 'flat' in equipment:
-                    extracted['load']['equipment_type'] = 'Flatbed'
-                else:
-                    extracted['load']['equipment_type'] = equipment.title()
-                break
+        match = _first_match(_EQUIPMENT_RES, _EQUIPMENT_KEYWORDS, text, folded)
+        if match:
+            equipment = match.group(1).strip()
+            # Normalize common equipment types
+            equipment = equipment.lower()
+            for keyword, equipment_type in _EQUIPMENT_TYPES:
+                if keyword in equipment:
+                    extracted['load']['equipment_type'] = equipment_type
+                    break
+            else:
+                # Interned: free-form types repeat across many loads
+                extracted['load']['equipment_type'] = sys.intern(equipment.title())
         
         return extracted
     
@@ -223,7 +305,7 @@ class EmailParser(CSVParser):
         if not data:
             return None
         
-        broker = Broker(source=DataSource.EMAIL, created_at=datetime.now())
+        broker = Broker(source=DataSource.EMAIL, created_at=self._parsed_at or datetime.now())
         broker.company_name = data.get('company_name')
         broker.mc_id = data.get('mc_id')
         
@@ -237,7 +319,7 @@ class EmailParser(CSVParser):
         if not origin and not destination:
             return None
         
-        lane = Lane(source=DataSource.EMAIL, created_at=datetime.now())
+        lane = Lane(source=DataSource.EMAIL, created_at=self._parsed_at or datetime.now())
         lane.origin_city_state = origin
         lane.destination_city_state = destination
         
@@ -262,7 +344,7 @@ class EmailParser(CSVParser):
             broker_id=broker.mc_id if broker else None,
             lane=lane,
             source=DataSource.EMAIL,
-            created_at=datetime.now()
+            created_at=self._parsed_at or datetime.now()
         )
         
         # Parse dates
@@ -290,13 +372,12 @@ class EmailParser(CSVParser):
             rate_amount=float(amount),
             rate_type='flat',
             source=DataSource.EMAIL,
-            created_at=datetime.now()
+            created_at=self._parsed_at or datetime.now()
         )
         
         return rate
     
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """Parse date string into datetime object"""
-        from parser.utils import parse_date
         return parse_date(date_str)
 
@@ -3,9 +3,12 @@ Excel parser for carrier data.
 Supports .xlsx and .xls files.
 """
 import pandas as pd
+from openpyxl import load_workbook
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from pathlib import Path
+from functools import lru_cache
+import os
 
 from schema import (
     Broker, Load, Lane, Rate, Address, CarrierProfile,
@@ -14,9 +17,79 @@ from schema import (
 from parser.csv_parser import CSVParser
 
 
+# Workbook formats openpyxl can stream without building a DataFrame
+STREAMED_EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+
+# Workbooks whose parsed cell strings are kept for re-parsing
+EXCEL_CACHE_SIZE = 64
+
+
+def _sheet_rows(worksheet):
+    """Yield a worksheet's rows as lists of cell strings (empty cells as '')"""
+    for row in worksheet.iter_rows(values_only=True):
+        yield ['' if value is None else str(value) for value in row]
+
+
+def _open_streamed_workbook(file_path: str):
+    """Open an .xlsx workbook for row streaming, or None to fall back to pandas"""
+    if Path(file_path).suffix.lower() not in STREAMED_EXCEL_EXTENSIONS:
+        return None
+    try:
+        return load_workbook(file_path, read_only=True, data_only=True)
+    except Exception:
+        # Let the pandas path try the file (and report the error)
+        return None
+
+
+def _frame_rows(df: pd.DataFrame):
+    """Yield the header row, then each row's cells (read with dtype=str, na_filter=False)"""
+    yield [str(column) for column in df.columns]
+    yield from df.itertuples(index=False, name=None)
+
+
+def _read_excel_frame(file_path: str) -> pd.DataFrame:
+    """Read the first sheet as strings, trying openpyxl then xlrd"""
+    try:
+        # Read Excel file
+        return pd.read_excel(file_path, engine='openpyxl', dtype=str, na_filter=False)
+    except Exception as e:
+        # Try with xlrd for .xls files
+        try:
+            return pd.read_excel(file_path, engine='xlrd', dtype=str, na_filter=False)
+        except Exception as e2:
+            raise ValueError(f"Could not parse Excel file: {e}, {e2}")
+
+
+@lru_cache(maxsize=EXCEL_CACHE_SIZE)
+def _read_excel_rows(file_path: str, mtime_ns: int, size: int) -> tuple:
+    """
+    Cell strings of the sheet ExcelParser.parse_file reads, as row tuples.
+    
+    mtime_ns and size only key the cache, so an edited file is read again.
+    """
+    workbook = _open_streamed_workbook(file_path)
+    if workbook is not None:
+        try:
+            return tuple(map(tuple, _sheet_rows(workbook.active)))
+        finally:
+            workbook.close()
+    
+    return tuple(map(tuple, _frame_rows(_read_excel_frame(file_path))))
+
+
 class ExcelParser(CSVParser):
     """Parser for Excel files containing carrier booking data"""
     
+    def __init__(self, cache_rows: bool = False):
+        """
+        Args:
+            cache_rows: Keep the cell strings of the last EXCEL_CACHE_SIZE
+                workbooks so re-parsing an unchanged file skips reading it.
+                Off by default: one-off uploads would only pin memory.
+        """
+        super().__init__()
+        self.cache_rows = cache_rows
+    
     def parse_file(self, file_path: str) -> CarrierProfile:
         """
         Parse an Excel file and return a CarrierProfile.
@@ -27,41 +100,24 @@ class ExcelParser(CSVParser):
         Returns:
             CarrierProfile with parsed data
         """
-        try:
-            # Read Excel file
-            df = pd.read_excel(file_path, engine='openpyxl')
-        except Exception as e:
-            # Try with xlrd for .xls files
+        if self.cache_rows:
             try:
-                df = pd.read_excel(file_path, engine='xlrd')
-            except Exception as e2:
-                raise ValueError(f"Could not parse Excel file: {e}, {e2}")
-        
-        # Convert to CSV-like format for processing
-        # Get headers
-        headers = df.columns.tolist()
-        
-        # Convert DataFrame to list of rows
-        rows = []
-        for _, row in df.iterrows():
-            rows.append([str(val) if pd.notna(val) else '' for val in row])
-        
-        # Build CSV content string
-        csv_lines = [','.join(headers)]
-        for row in rows:
-            # Escape commas in values
-            escaped_row = []
-            for val in row:
-                if ',' in val:
-                    escaped_row.append(f'"{val}"')
-                else:
-                    escaped_row.append(val)
-            csv_lines.append(','.join(escaped_row))
+                stat = os.stat(file_path)
+            except OSError as e:
+                raise ValueError(f"Could not parse Excel file: {e}")
+            
+            rows = _read_excel_rows(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+            return self.parse_rows(rows, source_file=file_path)
         
-        csv_content = '\n'.join(csv_lines)
+        # .xlsx: stream rows from the active sheet without building a DataFrame
+        workbook = _open_streamed_workbook(file_path)
+        if workbook is not None:
+            try:
+                return self.parse_rows(_sheet_rows(workbook.active), source_file=file_path)
+            finally:
+                workbook.close()
         
-        # Use parent CSV parser logic
-        return self.parse_content(csv_content, source_file=file_path)
+        return self.parse_rows(_frame_rows(_read_excel_frame(file_path)), source_file=file_path)
     
     def parse_sheets(self, file_path: str) -> Dict[str, CarrierProfile]:
         """
@@ -73,6 +129,13 @@ class ExcelParser(CSVParser):
         Returns:
             Dictionary mapping sheet names to CarrierProfile objects
         """
+        workbook = _open_streamed_workbook(file_path)
+        if workbook is not None:
+            try:
+                return self._parse_streamed_sheets(workbook, file_path)
+            finally:
+                workbook.close()
+        
         try:
             excel_file = pd.ExcelFile(file_path, engine='openpyxl')
         except Exception:
@@ -84,29 +147,25 @@ class ExcelParser(CSVParser):
         profiles = {}
         for sheet_name in excel_file.sheet_names:
             try:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name)
+                df = pd.read_excel(excel_file, sheet_name=sheet_name, dtype=str, na_filter=False)
                 
-                # Convert to CSV format
-                headers = df.columns.tolist()
-                rows = []
-                for _, row in df.iterrows():
-                    rows.append([str(val) if pd.notna(val) else '' for val in row])
-                
-                csv_lines = [','.join(headers)]
-                for row in rows:
-                    escaped_row = []
-                    for val in row:
-                        if ',' in val:
-                            escaped_row.append(f'"{val}"')
-                        else:
-                            escaped_row.append(val)
-                    csv_lines.append(','.join(escaped_row))
-                
-                csv_content = '\n'.join(csv_lines)
-                profiles[sheet_name] = self.parse_content(csv_content, source_file=f"{file_path}:{sheet_name}")
+                profiles[sheet_name] = self.parse_rows(_frame_rows(df), source_file=f"{file_path}:{sheet_name}")
             except Exception as e:
                 print(f"Warning: Could not parse sheet '{sheet_name}': {e}")
                 continue
         
         return profiles
-
+    
+    def _parse_streamed_sheets(self, workbook, file_path: str) -> Dict[str, CarrierProfile]:
+        """Parse every sheet of a read-only openpyxl workbook"""
+        profiles = {}
+        for worksheet in workbook.worksheets:
+            try:
+                profiles[worksheet.title] = self.parse_rows(
+                    _sheet_rows(worksheet), source_file=f"{file_path}:{worksheet.title}"
+                )
+            except Exception as e:
+                print(f"Warning: Could not parse sheet '{worksheet.title}': {e}")
+                continue
+        
+        return profiles
@@ -3,6 +3,7 @@ PDF parser for booking confirmations and carrier documents.
 Uses pdfplumber for better text extraction.
 """
 import re
+import string
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from pathlib import Path
@@ -17,6 +18,104 @@ from schema import (
     DataSource
 )
 from parser.csv_parser import CSVParser
+from parser.utils import parse_date
+
+
+# Broker and load identifiers sit in a confirmation's header, so their
+# patterns only scan this many leading characters of the document
+HEADER_SCAN_CHARS = 16384
+
+
+def _compile_all(*patterns: str, flags: int = re.IGNORECASE) -> tuple:
+    """Compile patterns once, in priority order"""
+    return tuple(re.compile(pattern, flags) for pattern in patterns)
+
+
+# Extraction patterns, each group tried in order (first match wins)
+
+# Company name
+_COMPANY_RES = _compile_all(
+    r'(?:Broker|Carrier|Company)[:\s]+([A-Z][A-Za-z\s&,\.]+)',
+    # Anchored at the start of a run of name characters: a later start in the
+    # same run can never match when the first one fails, and trying every
+    # offset made long suffix-less text quadratic
+    r'(?<![A-Za-z\s&,\.])[\s&,\.]*([A-Z][A-Za-z\s&,\.]+)\s+(?:LLC|Inc|Corp|Ltd)',
+)
+
+# MC number (explicit case classes: an IGNORECASE literal is scanned for
+# much more slowly than a character class)
+_MC_RE = re.compile(r'[Mm][Cc][#:\s]*(\d+)')
+
+# Phone number (case-sensitive)
+_PHONE_RES = _compile_all(
+    r'Phone[:\s]+([\d\s\-\(\)]+)',
+    r'(\d{3}[-\.\s]?\d{3}[-\.\s]?\d{4})',
+    flags=0,
+)
+
+# Email
+_EMAIL_RE = re.compile(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+_EMAIL_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + '._%+-')
+
+# Load ID
+_LOAD_ID_RES = _compile_all(
+    r'Load[#:\s]+([A-Z0-9\-]+)',
+    r'Booking[#:\s]+([A-Z0-9\-]+)',
+    r'Pro[#:\s]+([A-Z0-9\-]+)',
+)
+
+# Origin
+_ORIGIN_RES = _compile_all(
+    r'Origin[:\s]+(.+?)(?:\n|Destination|$)',
+    r'Pickup[:\s]+(.+?)(?:\n|Delivery|$)',
+    r'From[:\s]+(.+?)(?:\n|To|$)',
+)
+
+# Destination
+_DESTINATION_RES = _compile_all(
+    r'Destination[:\s]+([^\n]+)',
+    r'Delivery[:\s]+([^\n]+)',
+    r'To[:\s]+([^\n]+)',
+)
+
+# Rate
+_RATE_RES = _compile_all(
+    r'Rate[:\s]+\$?([\d,]+\.?\d*)',
+    r'Amount[:\s]+\$?([\d,]+\.?\d*)',
+    r'\$([\d,]+\.?\d*)\s*(?:Total|Rate|Amount)',
+)
+
+# Dates: load field each pattern fills
+_DATE_FIELD_RES = (
+    ('pickup_date', re.compile(r'Pickup[:\s]+Date[:\s]+([^\n]+)', re.IGNORECASE)),
+    ('delivery_date', re.compile(r'Delivery[:\s]+Date[:\s]+([^\n]+)', re.IGNORECASE)),
+    ('booking_date', re.compile(r'Date[:\s]+([^\n]+)', re.IGNORECASE)),
+)
+
+
+def _search_email(text: str) -> Optional[re.Match]:
+    """
+    Search text for an email address, starting at the first '@'.
+    
+    No match can start before the run of local-part characters leading up to
+    the first '@', so the scan starts there rather than at every earlier
+    offset (and text without an '@' is never scanned at all).
+    """
+    at = text.find('@')
+    if at < 0:
+        return None
+    start = at
+    while start and text[start - 1] in _EMAIL_LOCAL_CHARS:
+        start -= 1
+    return _EMAIL_RE.search(text, start)
+
+
+def _page_text(page) -> str:
+    """Extract a page's text, then drop the page's cached layout objects"""
+    try:
+        return page.extract_text() or ""
+    finally:
+        page.flush_cache()
 
 
 class PDFParser:
@@ -25,6 +124,8 @@ class PDFParser:
     def __init__(self):
         if pdfplumber is None:
             raise ImportError("pdfplumber is required for PDF parsing. Install with: pip install pdfplumber")
+        # Timestamp stamped on every object from one parse (set per parse_file call)
+        self._parsed_at: Optional[datetime] = None
     
     def parse_file(self, file_path: str) -> CarrierProfile:
         """
@@ -40,11 +141,12 @@ class PDFParser:
         loads = []
         lanes = []
         rates = []
+        self._parsed_at = datetime.now()
         
+        # pdfplumber already shares one pdfminer resource manager (fonts, CMaps)
+        # across the document's pages
         with pdfplumber.open(file_path) as pdf:
-            full_text = ""
-            for page in pdf.pages:
-                full_text += page.extract_text() or ""
+            full_text = "".join(_page_text(page) for page in pdf.pages)
         
         # Extract structured data from text
         extracted_data = self._extract_data_from_text(full_text)
@@ -83,135 +185,109 @@ class PDFParser:
             brokers=brokers,
             loads=loads,
             lanes=lanes,
-            created_at=datetime.now()
+            created_at=self._parsed_at
         )
     
     def _extract_data_from_text(self, text: str) -> Dict[str, Any]:
         """Extract structured data from PDF text using regex patterns"""
-        extracted = {
-            'broker': {},
-            'load': {},
-            'lane': {},
-            'rate': {}
-        }
+        # One flat dict per record type, returned grouped at the end
+        broker = {}
+        load = {}
+        lane = {}
+        rate = {}
+        
+        header = text[:HEADER_SCAN_CHARS]
         
         # Extract broker information
-        # Company name patterns
-        company_patterns = [
-            r'(?:Broker|Carrier|Company)[:\s]+([A-Z][A-Za-z\s&,\.]+)',
-            r'([A-Z][A-Za-z\s&,\.]+)\s+(?:LLC|Inc|Corp|Ltd)',
-        ]
-        for pattern in company_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        # Company name
+        for pattern in _COMPANY_RES:
+            match = pattern.search(header)
             if match:
-                extracted['broker']['company_name'] = match.group(1).strip()
+                broker['company_name'] = match.group(1).strip()
                 break
         
         # MC number
-        mc_match = re.search(r'MC[#:\s]*(\d+)', text, re.IGNORECASE)
+        mc_match = _MC_RE.search(header)
         if mc_match:
-            extracted['broker']['mc_id'] = mc_match.group(1)
+            broker['mc_id'] = mc_match.group(1)
         
         # Phone number
-        phone_patterns = [
-            r'Phone[:\s]+([\d\s\-\(\)]+)',
-            r'(\d{3}[-\.\s]?\d{3}[-\.\s]?\d{4})',
-        ]
-        for pattern in phone_patterns:
-            match = re.search(pattern, text)
+        for pattern in _PHONE_RES:
+            match = pattern.search(header)
             if match:
-                extracted['broker']['phone'] = match.group(1).strip()
+                broker['phone'] = match.group(1).strip()
                 break
         
         # Email
-        email_match = re.search(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', text)
+        email_match = _search_email(header)
         if email_match:
-            extracted['broker']['email'] = email_match.group(1)
+            broker['email'] = email_match.group(1)
         
         # Load ID
-        load_id_patterns = [
-            r'Load[#:\s]+([A-Z0-9\-]+)',
-            r'Booking[#:\s]+([A-Z0-9\-]+)',
-            r'Pro[#:\s]+([A-Z0-9\-]+)',
-        ]
-        for pattern in load_id_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _LOAD_ID_RES:
+            match = pattern.search(header)
             if match:
-                extracted['load']['load_id'] = match.group(1).strip()
+                load['load_id'] = match.group(1).strip()
                 break
         
         # Origin and Destination
-        origin_patterns = [
-            r'Origin[:\s]+(.+?)(?:\n|Destination|$)',
-            r'Pickup[:\s]+(.+?)(?:\n|Delivery|$)',
-            r'From[:\s]+(.+?)(?:\n|To|$)',
-        ]
-        for pattern in origin_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _ORIGIN_RES:
+            match = pattern.search(text)
             if match:
                 origin = match.group(1).strip()
-                extracted['lane']['origin'] = origin
+                lane['origin'] = origin
                 break
         
-        destination_patterns = [
-            r'Destination[:\s]+(.+?)(?:\n|$)',
-            r'Delivery[:\s]+(.+?)(?:\n|$)',
-            r'To[:\s]+(.+?)(?:\n|$)',
-        ]
-        for pattern in destination_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _DESTINATION_RES:
+            match = pattern.search(text)
             if match:
                 destination = match.group(1).strip()
-                extracted['lane']['destination'] = destination
+                lane['destination'] = destination
                 break
         
         # Rate
-        rate_patterns = [
-            r'Rate[:\s]+\$?([\d,]+\.?\d*)',
-            r'Amount[:\s]+\$?([\d,]+\.?\d*)',
-            r'\$([\d,]+\.?\d*)\s*(?:Total|Rate|Amount)',
-        ]
-        for pattern in rate_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _RATE_RES:
+            match = pattern.search(text)
             if match:
                 rate_str = match.group(1).replace(',', '')
                 try:
-                    extracted['rate']['amount'] = float(rate_str)
+                    rate['amount'] = float(rate_str)
                 except ValueError:
                     pass
                 break
         
-        # Dates
-        date_patterns = [
-            r'Pickup[:\s]+Date[:\s]+(.+?)(?:\n|$)',
-            r'Delivery[:\s]+Date[:\s]+(.+?)(?:\n|$)',
-            r'Date[:\s]+(.+?)(?:\n|$)',
-        ]
-        for pattern in date_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        # Dates (every pattern is tried; each fills its own field)
+        for field, pattern in _DATE_FIELD_RES:
+            match = pattern.search(text)
             if match:
-                date_str = match.group(1).strip()
-                if 'pickup' in pattern.lower() or 'Pickup' in pattern:
-                    extracted['load']['pickup_date'] = date_str
-                elif 'delivery' in pattern.lower() or 'Delivery' in pattern:
-                    extracted['load']['delivery_date'] = date_str
-                else:
-                    extracted['load']['booking_date'] = date_str
+                load[field] = match.group(1).strip()
         
-        return extracted
+        return {
+            'broker': broker,
+            'load': load,
+            'lane': lane,
+            'rate': rate
+        }
     
     def _create_broker_from_extracted(self, data: Dict[str, Any]) -> Optional[Broker]:
         """Create Broker from extracted PDF data"""
         if not data:
             return None
         
-        broker = Broker(source=DataSource.PDF, created_at=datetime.now())
-        broker.company_name = data.get('company_name')
-        broker.mc_id = data.get('mc_id')
-        broker.broker_phone_number = data.get('phone')
-        broker.broker_email = data.get('email')
+        company_name = data.get('company_name')
+        mc_id = data.get('mc_id')
+        if not company_name and not mc_id:
+            return None
         
-        return broker if broker.company_name or broker.mc_id else None
+        # Fields passed to the constructor rather than assigned afterwards
+        return Broker(
+            company_name=company_name,
+            mc_id=mc_id,
+            broker_phone_number=data.get('phone'),
+            broker_email=data.get('email'),
+            source=DataSource.PDF,
+            created_at=self._parsed_at or datetime.now()
+        )
     
     def _create_lane_from_extracted(self, data: Dict[str, Any]) -> Optional[Lane]:
         """Create Lane from extracted PDF data"""
@@ -221,16 +297,14 @@ class PDFParser:
         if not origin and not destination:
             return None
         
-        lane = Lane(source=DataSource.PDF, created_at=datetime.now())
-        lane.origin_city_state = origin
-        lane.destination_city_state = destination
-        
-        if origin:
-            lane.origin = Address(raw_address=origin)
-        if destination:
-            lane.destination = Address(raw_address=destination)
-        
-        return lane
+        return Lane(
+            origin=Address(raw_address=origin) if origin else None,
+            destination=Address(raw_address=destination) if destination else None,
+            origin_city_state=origin,
+            destination_city_state=destination,
+            source=DataSource.PDF,
+            created_at=self._parsed_at or datetime.now()
+        )
     
     def _create_load_from_extracted(self, data: Dict[str, Any], 
                                    broker: Optional[Broker],
@@ -240,26 +314,19 @@ class PDFParser:
         if not load_id:
             return None
         
-        load = Load(
+        # Missing dates stay None (parse_date returns None for empty input)
+        return Load(
             load_id=load_id,
             broker=broker,
             broker_id=broker.mc_id if broker else None,
             lane=lane,
+            pickup_date=self._parse_date(data.get('pickup_date')),
+            delivery_date=self._parse_date(data.get('delivery_date')),
+            status='booked',
+            booking_date=self._parse_date(data.get('booking_date')),
             source=DataSource.PDF,
-            created_at=datetime.now()
+            created_at=self._parsed_at or datetime.now()
         )
-        
-        # Parse dates
-        if data.get('pickup_date'):
-            load.pickup_date = self._parse_date(data['pickup_date'])
-        if data.get('delivery_date'):
-            load.delivery_date = self._parse_date(data['delivery_date'])
-        if data.get('booking_date'):
-            load.booking_date = self._parse_date(data['booking_date'])
-        
-        load.status = 'booked'
-        
-        return load
     
     def _create_rate_from_extracted(self, data: Dict[str, Any],
                                    load: Optional[Load]) -> Optional[Rate]:
@@ -273,13 +340,12 @@ class PDFParser:
             rate_amount=float(amount),
             rate_type='flat',
             source=DataSource.PDF,
-            created_at=datetime.now()
+            created_at=self._parsed_at or datetime.now()
         )
         
         return rate
     
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """Parse date string into datetime object"""
-        from parser.utils import parse_date
         return parse_date(date_str)
 
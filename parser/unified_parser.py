@@ -2,23 +2,46 @@
 Unified parser interface for all file types.
 Automatically detects file type and uses appropriate parser.
 """
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from itertools import chain
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
+import multiprocessing
+import os
 
 from schema import CarrierProfile, DataSource
-from parser.csv_parser import CSVParser
-from parser.excel_parser import ExcelParser
-from parser.pdf_parser import PDFParser
+
+
+# Start method for parse worker processes. Callers such as the API's JobQueue
+# run on worker threads, and forking a multithreaded process can copy locks
+# held by other threads into the child; forkserver/spawn children start clean.
+_PARSE_POOL_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
 
 
 class UnifiedParser:
     """Unified interface for parsing carrier data from various file formats"""
     
-    def __init__(self):
-        self.csv_parser = CSVParser()
-        self.excel_parser = ExcelParser()
-        self.pdf_parser = PDFParser()
+    # Each format's parser (and its pandas/openpyxl/pdfplumber imports) is
+    # only loaded the first time a file of that type is parsed
+    
+    @cached_property
+    def csv_parser(self):
+        from parser.csv_parser import CSVParser
+        return CSVParser()
+    
+    @cached_property
+    def excel_parser(self):
+        from parser.excel_parser import ExcelParser
+        return ExcelParser()
+    
+    @cached_property
+    def pdf_parser(self):
+        from parser.pdf_parser import PDFParser
+        return PDFParser()
     
     def parse_file(self, file_path: str) -> CarrierProfile:
         """
@@ -53,24 +76,48 @@ class UnifiedParser:
         Returns:
             Merged CarrierProfile
         """
-        merged_profile = CarrierProfile(created_at=datetime.now())
-        
-        for file_path in file_paths:
-            try:
-                profile = self.parse_file(file_path)
-                
-                # Merge brokers
-                merged_profile.brokers.extend(profile.brokers)
-                
-                # Merge loads
-                merged_profile.loads.extend(profile.loads)
-                
-                # Merge lanes
-                merged_profile.lanes.extend(profile.lanes)
-                
-            except Exception as e:
-                print(f"Warning: Could not parse {file_path}: {e}")
+        created_at = datetime.now()
+        profiles = []
+        for file_path, profile in zip(file_paths, parse_each(file_paths, self)):
+            if isinstance(profile, Exception):
+                print(f"Warning: Could not parse {file_path}: {profile}")
                 continue
+            profiles.append(profile)
         
-        return merged_profile
+        # Each merged list is built once, in file order
+        return CarrierProfile(
+            brokers=list(chain.from_iterable(profile.brokers for profile in profiles)),
+            loads=list(chain.from_iterable(profile.loads for profile in profiles)),
+            lanes=list(chain.from_iterable(profile.lanes for profile in profiles)),
+            created_at=created_at
+        )
+
+
+def parse_each(file_paths: list[str], parser: Optional[UnifiedParser] = None) -> list:
+    """
+    Parse each file, in worker processes when there is more than one.
+    
+    Parsing is CPU-bound, so processes rather than threads give real parallelism;
+    a single file is parsed in-process to avoid the pool start-up cost.
+    
+    Args:
+        file_paths: List of file paths to parse
+        parser: Parser for the in-process case (workers build their own)
+        
+    Returns:
+        Per file, in order, its CarrierProfile or the exception it raised
+    """
+    if len(file_paths) <= 1:
+        return [parse_or_error(file_path, parser) for file_path in file_paths]
+    
+    max_workers = min(len(file_paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_PARSE_POOL_CONTEXT) as pool:
+        return list(pool.map(parse_or_error, file_paths))
+
 
+def parse_or_error(file_path: str, parser: Optional[UnifiedParser] = None):
+    """Parse one file, returning the exception instead of raising (picklable for worker processes)"""
+    try:
+        return (parser or UnifiedParser()).parse_file(file_path)
+    except Exception as e:
+        return e
@@ -5,6 +5,44 @@ Contains common parsing logic to avoid duplication.
 import re
 from typing import Optional, Tuple
 from datetime import datetime
+import calendar
+
+# Every ASCII byte except 0-9, for bytes.translate deletion
+_ASCII_NON_DIGITS = bytes(c for c in range(128) if not 48 <= c <= 57)
+_NON_DIGIT_RE = re.compile(r'[^\d]')
+
+# Trailing time of day stripped before trying the date formats
+_TIME_RE = re.compile(r'\s+\d{1,2}:\d{2}\s*(AM|PM)?', re.IGNORECASE)
+
+# Date shapes handled without strptime; anything else (or any out-of-range
+# value) goes through the strptime format loop
+_NUMERIC_DATE_RE = re.compile(r'(\d{1,2})([/-])(\d{1,2})\2(\d{4}|\d{2})', re.ASCII)
+_ISO_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})', re.ASCII)
+_MONTH_DAY_YEAR_RE = re.compile(r'([A-Za-z]+)\s+(\d{1,2}),\s+(\d{4})', re.ASCII)
+_DAY_MONTH_YEAR_RE = re.compile(r'(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})', re.ASCII)
+
+# Full and abbreviated month names (lowercase) -> month number
+_MONTHS = {
+    name.lower(): number
+    for names in (calendar.month_name, calendar.month_abbr)
+    for number, name in enumerate(names) if name
+}
+
+# Common trip patterns: "City ST to City ST", "City, ST to City, ST"
+_TRIP_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(.+?)\s+to\s+(.+)',   # "Miami FL to Tampa FL"
+    r'(.+?)\s+→\s+(.+)',     # "Miami FL → Tampa FL"
+    r'(.+?)\s+-\s+(.+)',     # "Miami FL - Tampa FL"
+))
+
+# Rate patterns, tried in order
+_RATE_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)',           # $1,234.56
+    r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*dollars?',  # 1234.56 dollars
+    r'rate[:\s]+\$?([\d,]+\.?\d*)',              # rate: 1234.56
+    r'amount[:\s]+\$?([\d,]+\.?\d*)',            # amount: 1234.56
+    r'total[:\s]+\$?([\d,]+\.?\d*)',            # total: 1234.56
+))
 
 
 def parse_date(date_str: str) -> Optional[datetime]:
@@ -36,11 +74,19 @@ def parse_date(date_str: str) -> Optional[datetime]:
     
     # Clean date string
     date_str = date_str.strip()
-    # Remove time if present for some formats
-    date_str = re.sub(r'\s+\d{1,2}:\d{2}\s*(AM|PM)?', '', date_str, flags=re.IGNORECASE)
+    # Remove time if present for some formats (a time always has a colon)
+    if ':' in date_str:
+        date_str = _TIME_RE.sub('', date_str)
     # Handle multiple dates (take first)
     date_str = date_str.split('\n')[0].strip()
     
+    try:
+        date = _match_common_date(date_str)
+    except ValueError:
+        date = None
+    if date:
+        return date
+    
     for fmt in date_formats:
         try:
             return datetime.strptime(date_str, fmt)
@@ -50,6 +96,40 @@ def parse_date(date_str: str) -> Optional[datetime]:
     return None
 
 
+def _match_common_date(date_str: str) -> Optional[datetime]:
+    """
+    Build a datetime directly for the common date shapes.
+    
+    Covers the numeric, ISO and month-name formats parse_date lists; raises
+    ValueError for out-of-range values and returns None for other shapes.
+    """
+    match = _NUMERIC_DATE_RE.fullmatch(date_str)
+    if match:
+        month, separator, day, year = match.groups()
+        if len(year) == 2:
+            if separator == '-':
+                return None
+            year = int(year)
+            year += 2000 if year <= 68 else 1900
+        return datetime(int(year), int(month), int(day))
+    
+    match = _ISO_DATE_RE.fullmatch(date_str)
+    if match:
+        year, month, day = match.groups()
+        return datetime(int(year), int(month), int(day))
+    
+    match = _MONTH_DAY_YEAR_RE.fullmatch(date_str)
+    if match:
+        month_name, day, year = match.groups()
+    else:
+        match = _DAY_MONTH_YEAR_RE.fullmatch(date_str)
+        if not match:
+            return None
+        day, month_name, year = match.groups()
+    month = _MONTHS.get(month_name.lower())
+    return datetime(int(year), month, int(day)) if month else None
+
+
 def parse_trip(trip_str: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Parse trip string into origin and destination.
@@ -63,16 +143,8 @@ def parse_trip(trip_str: str) -> Tuple[Optional[str], Optional[str]]:
     if not trip_str:
         return None, None
     
-    # Common patterns: "City ST to City ST", "City, ST to City, ST"
-    patterns = [
-        r'(.+?)\s+to\s+(.+)',   # "Miami FL to Tampa FL"
-        r'(.+?)\s+→\s+(.+)',     # "Miami FL → Tampa FL"
-        r'(.+?)\s+-\s+(.+)',     # "Miami FL - Tampa FL"
-        r'(.+?)\s+→\s+(.+)',     # Unicode arrow
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, trip_str, re.IGNORECASE)
+    for pattern in _TRIP_RES:
+        match = pattern.search(trip_str)
         if match:
             origin = match.group(1).strip()
             destination = match.group(2).strip()
@@ -93,7 +165,21 @@ def normalize_mc_id(mc_id: str) -> str:
     """
     if not mc_id:
         return ""
-    return re.sub(r'[^\d]', '', str(mc_id))
+    return digits_only(str(mc_id))
+
+
+def digits_only(value: str) -> str:
+    """
+    Remove all non-digit characters (Unicode decimal digits are kept).
+    
+    Already-clean values are returned as is and ASCII input is filtered with
+    bytes.translate; only non-ASCII input goes through the regex.
+    """
+    if value.isdecimal():
+        return value
+    if value.isascii():
+        return value.encode('ascii').translate(None, _ASCII_NON_DIGITS).decode('ascii')
+    return _NON_DIGIT_RE.sub('', value)
 
 
 def extract_rate_from_text(text: str) -> Optional[float]:
@@ -109,17 +195,8 @@ def extract_rate_from_text(text: str) -> Optional[float]:
     if not text:
         return None
     
-    # Rate patterns
-    rate_patterns = [
-        r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)',           # $1,234.56
-        r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*dollars?',  # 1234.56 dollars
-        r'rate[:\s]+\$?([\d,]+\.?\d*)',              # rate: 1234.56
-        r'amount[:\s]+\$?([\d,]+\.?\d*)',            # amount: 1234.56
-        r'total[:\s]+\$?([\d,]+\.?\d*)',            # total: 1234.56
-    ]
-    
-    for pattern in rate_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _RATE_RES:
+        match = pattern.search(text)
         if match:
             rate_str = match.group(1).replace(',', '')
             try:
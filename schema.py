@@ -6,6 +6,10 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from dataclasses import dataclass, field
 from enum import Enum
+from operator import methodcaller
+
+# Shared to_dict() caller for serializing lists of records
+_TO_DICT = methodcaller('to_dict')
 
 
 class DataSource(Enum):
@@ -28,7 +32,7 @@ class EnrichmentSource(Enum):
     ESTIMATED = "estimated"
 
 
-@dataclass
+@dataclass(slots=True)
 class Address:
     """Normalized address information"""
     street: Optional[str] = None
@@ -53,7 +57,7 @@ class Address:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Broker:
     """Broker information"""
     broker_id: Optional[str] = None
@@ -88,7 +92,7 @@ class Broker:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Lane:
     """Shipping lane definition"""
     lane_id: Optional[str] = None
@@ -115,7 +119,7 @@ class Lane:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Rate:
     """Rate information for a load"""
     rate_id: Optional[str] = None
@@ -142,7 +146,7 @@ class Rate:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Load:
     """Load/booking information"""
     load_id: Optional[str] = None
@@ -197,7 +201,7 @@ class Load:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class CarrierProfile:
     """Complete carrier profile with all historical data"""
     carrier_id: Optional[str] = None
@@ -223,9 +227,9 @@ class CarrierProfile:
             'carrier_id': self.carrier_id,
             'carrier_name': self.carrier_name,
             'mc_number': self.mc_number,
-            'brokers': [b.to_dict() for b in self.brokers],
-            'loads': [l.to_dict() for l in self.loads],
-            'lanes': [l.to_dict() for l in self.lanes],
+            'brokers': list(map(_TO_DICT, self.brokers)),
+            'loads': list(map(_TO_DICT, self.loads)),
+            'lanes': list(map(_TO_DICT, self.lanes)),
             'preferred_lanes': self.preferred_lanes,
             'preferred_equipment': self.preferred_equipment,
             'preferred_brokers': self.preferred_brokers,
@@ -234,7 +238,7 @@ class CarrierProfile:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class EnrichedData:
     """Enriched data from freight market sources"""
     lane_id: Optional[str] = None
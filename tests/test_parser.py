@@ -85,3 +85,483 @@ def test_unified_parser():
         assert profile is not None
         assert len(profile.brokers) > 0
 
+
+
+def test_save_carrier_profile_twice(tmp_path):
+    """Test saving the same profile twice updates rows instead of failing"""
+    from database import Database, BrokerModel, LoadModel
+    from schema import CarrierProfile, Broker, Load
+    
+    broker = Broker(mc_id="123456", company_name="ABC Logistics")
+    profile = CarrierProfile(
+        brokers=[broker],
+        loads=[Load(load_id="L1", broker=broker, broker_id="123456")]
+    )
+    
+    database = Database(f"sqlite:///{tmp_path / 'test.db'}")
+    database.save_carrier_profile(profile, "carrier_1")
+    broker.company_name = "ABC Logistics LLC"
+    database.save_carrier_profile(profile, "carrier_1")
+    
+    session = database.get_session()
+    try:
+        assert session.query(LoadModel).count() == 1
+        brokers = session.query(BrokerModel).all()
+        assert len(brokers) == 1
+        assert brokers[0].company_name == "ABC Logistics LLC"
+    finally:
+        session.close()
+    
+    # Relationships are eager-loaded, so they are usable after the session closes
+    carrier = database.get_carrier_profile("carrier_1")
+    assert [load.load_id for load in carrier.loads] == ["L1"]
+    assert [b.broker_id for b in carrier.brokers] == ["broker_123456"]
+
+
+def test_generate_matches_uses_stored_history(tmp_path):
+    """Test matching scores against the carrier history rebuilt from the database"""
+    from database import Database
+    from onboarding import OnboardingFlow
+    from schema import CarrierProfile, Broker, Lane, Load, Rate
+    
+    broker = Broker(mc_id="123456", company_name="ABC Logistics")
+    lane = Lane(origin_city_state="Miami, FL", destination_city_state="Tampa, FL", distance_miles=280.0)
+    profile = CarrierProfile(
+        brokers=[broker],
+        lanes=[lane],
+        loads=[Load(load_id="L1", broker=broker, broker_id="123456", lane=lane,
+                    rate=Rate(rate_amount=700.0, rate_per_mile=2.5))],
+        preferred_lanes=["Miami, FL→Tampa, FL"]
+    )
+    
+    database = Database(f"sqlite:///{tmp_path / 'test.db'}")
+    database.save_carrier_profile(profile, "carrier_1")
+    
+    candidate = Load(load_id="N1", broker=Broker(mc_id="123456", company_name="ABC Logistics"),
+                     lane=Lane(origin_city_state="Miami, FL", destination_city_state="Tampa, FL"))
+    result = OnboardingFlow(database).generate_matches("carrier_1", [candidate])
+    
+    reasons = result['matches'][0]['match_reasons']
+    assert "Historical broker: ABC Logistics" in reasons
+    assert "Exact lane match: Miami, FL→Tampa, FL" in reasons
+    assert "Preferred lane: Miami, FL→Tampa, FL" in reasons
+
+
+def test_match_loads_batch_matches_scalar_ranking():
+    """Test vectorized matching ranks loads exactly like match_loads"""
+    from load_matching import LoadMatchingEngine, loads_to_frame
+    from schema import CarrierProfile, Broker, Lane, Load, Rate
+    
+    def make_load(load_id, mc_id, origin, destination, equipment=None, amount=None, miles=None):
+        return Load(
+            load_id=load_id,
+            broker=Broker(mc_id=mc_id, company_name=f"Broker {mc_id}"),
+            lane=Lane(origin_city_state=origin, destination_city_state=destination,
+                      distance_miles=miles),
+            rate=Rate(rate_amount=amount, rate_per_mile=amount / miles if amount and miles else None),
+            equipment_type=equipment
+        )
+    
+    history = [
+        make_load("H1", "111", "Miami, FL", "Tampa, FL", "Dry Van", 600.0, 280.0),
+        make_load("H2", "222", "Tampa, FL", "Orlando, FL", "Flatbed", 300.0, 85.0),
+        make_load("H3", "111", "Miami, FL", "Atlanta, GA", "Dry Van", 1500.0, 660.0),
+    ]
+    profile = CarrierProfile(
+        loads=history,
+        lanes=[load.lane for load in history],
+        preferred_lanes=["Miami, FL→Tampa, FL", "Tampa, FL→Orlando, FL"],
+        preferred_brokers=["111", "222"],
+        preferred_equipment=["Dry Van", "Flatbed"]
+    )
+    candidates = [
+        make_load("C1", "111", "Miami, FL", "Tampa, FL", "Dry Van", 610.0, 280.0),
+        make_load("C2", "999", "Tampa, FL", "Miami, FL"),
+        make_load("C3", "222", "Boston, MA", "New York, NY", "Flatbed"),
+        make_load("C4", "999", "Boston, MA", "New York, NY"),
+        make_load("C5", "999", "Boston, MA", "New York, NY"),
+        make_load("C6", None, "Orlando, FL", "Tampa, FL", "Reefer", 900.0, 85.0),
+    ]
+    
+    candidates_df = loads_to_frame([load.to_dict() for load in candidates])
+    
+    engine = LoadMatchingEngine(profile)
+    for limit in (1, 3, 10):
+        expected = engine.match_loads(candidates, limit)
+        for actual in (engine.match_loads_batch(candidates, limit),
+                       engine.match_from_df(candidates_df, limit)):
+            assert [m.load.load_id for m in actual] == [m.load.load_id for m in expected]
+            assert [m.score for m in actual] == [m.score for m in expected]
+            assert [m.match_reasons for m in actual] == [m.match_reasons for m in expected]
+
+
+def _without_timestamps(value):
+    """Profile dict with the per-parse created_at stamps removed"""
+    if isinstance(value, dict):
+        return {key: _without_timestamps(item) for key, item in value.items() if key != 'created_at'}
+    if isinstance(value, list):
+        return [_without_timestamps(item) for item in value]
+    return value
+
+
+def test_circuit_breaker_transitions(monkeypatch):
+    """Test the breaker opens on repeated failures and half-opens after the reset timeout"""
+    import enrichment
+    from enrichment import CircuitState
+    
+    clock = [1000.0]
+    monkeypatch.setattr(enrichment.time, 'monotonic', lambda: clock[0])
+    breaker = CircuitState(failure_threshold=3, failure_window=60.0, reset_timeout=30.0)
+    
+    # Failures further apart than the window don't accumulate
+    for _ in range(3):
+        breaker.on_failure()
+        clock[0] += 61.0
+    assert not breaker.is_open
+    
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.on_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+    
+    # One probe after the reset timeout; a failed probe reopens the circuit
+    clock[0] += 30.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.on_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+    
+    # A successful probe closes it
+    clock[0] += 30.0
+    assert breaker.allow()
+    breaker.on_success()
+    assert not breaker.is_open
+    assert breaker.allow() and breaker.allow()
+
+
+def test_normalize_company_name_matches_regex():
+    """Test company name normalization agrees with the regex suffix/punctuation passes"""
+    import random
+    import re
+    
+    def regex_normalize(name):
+        if not name:
+            return ""
+        name = name.upper().strip()
+        name = re.sub(r'\s+(LLC|INC|CORP|LTD|LP|LLP)\s*$', '', name)
+        name = re.sub(r'[^\w\s]', '', name)
+        name = re.sub(r'\s+', ' ', name)
+        return name
+    
+    rng = random.Random(0)
+    words = ['ABC', 'Logistics', 'llc', 'Inc', 'Inc.', 'LP', 'corp', '&', 'Sons,', 'St.', '7',
+             'Star', 'LLC', 'Müller', ' ', '\t', '-']
+    samples = ['', 'LLC', ' ABC Logistics LLC ', 'ABC, LLC', 'ABC LLC.', 'ABC\tInc\n']
+    samples += [' '.join(rng.choice(words) for _ in range(rng.randint(1, 6))) for _ in range(2000)]
+    
+    for name in samples:
+        assert DataNormalizer._normalize_company_name(name) == regex_normalize(name), name
+
+
+def test_digits_only_matches_regex():
+    """Test digits_only agrees with stripping non-digits by regex"""
+    import random
+    import re
+    from parser.utils import digits_only
+    
+    rng = random.Random(0)
+    alphabet = '0123456789 -#()MCmc.٣²Ⅷé'
+    samples = ['', '123456', 'MC# 123-456', '١٢٣']
+    samples += [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(2000)]
+    
+    for text in samples:
+        assert digits_only(text) == re.sub(r'[^\d]', '', text), text
+
+
+def test_csv_chunked_read_matches_csv_reader(tmp_path, monkeypatch):
+    """Test the pandas chunked read and the csv.reader fallback parse like csv.reader"""
+    import csv
+    import parser.csv_parser as csv_parser
+    
+    csv_file = Path(__file__).parent.parent / 'parser' / 'brokers.csv'
+    
+    def reader_profile(path):
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            return _without_timestamps(CSVParser().parse_rows(csv.reader(file), source_file=str(path)).to_dict())
+    
+    # Several chunks per file
+    monkeypatch.setattr(csv_parser, 'CSV_CHUNK_ROWS', 7)
+    expected = reader_profile(csv_file)
+    assert _without_timestamps(CSVParser().parse_file(str(csv_file)).to_dict()) == expected
+    
+    # Ragged rows make pandas raise ParserError, so csv.reader takes over
+    ragged = tmp_path / 'ragged.csv'
+    ragged.write_text("Broker,MC#,Trip\nABC Logistics,123456,Miami FL - Tampa FL,extra\n", encoding='utf-8')
+    profile = CSVParser().parse_file(str(ragged))
+    assert _without_timestamps(profile.to_dict()) == reader_profile(ragged)
+    assert [broker.mc_id for broker in profile.brokers] == ['123456']
+    
+    empty = tmp_path / 'empty.csv'
+    empty.write_text("", encoding='utf-8')
+    assert CSVParser().parse_file(str(empty)).brokers == []
+
+
+def test_email_keyword_prefilter_matches_full_scan(monkeypatch):
+    """Test the keyword gates and anchored company pattern find what the full scans find"""
+    import random
+    import re
+    import parser.email_parser as email_parser
+    
+    rng = random.Random(0)
+    fragments = ['Broker: ABC Logistics LLC', 'FROM: xyz transport inc', 'MC#: 123456', 'mc 99',
+                 'Motor Carrier 42', 'Load #: L-12345', 'PRO: 77', 'Origin: Miami, FL',
+                 'PICKUP: Tampa City', 'Destination: Atlanta, GA', 'to: Boston', 'Rate: $1,500.00',
+                 '$900 Total', 'Pickup Date: 10/28/2024', 'date: 10/29/24', 'Equipment: Reefer',
+                 'TYPE: flatbed', 'Thank you', 'Acme & Sons, Corp', 'İnc', 'carrier  Foo Ltd',
+                 'lowercase words only', '\n', '   ']
+    samples = [' '.join(rng.choice(fragments) for _ in range(rng.randint(0, 8))) for _ in range(500)]
+    
+    parser = EmailParser()
+    filtered = [parser._extract_from_email(text) for text in samples]
+    monkeypatch.setattr(email_parser, '_mentions', lambda folded, keywords: True)
+    unfiltered = [parser._extract_from_email(text) for text in samples]
+    assert filtered == unfiltered
+    
+    unanchored = re.compile(r'([A-Z][A-Za-z\s&,\.]+(?:LLC|Inc|Corp|Ltd))', re.IGNORECASE)
+    anchored = email_parser._COMPANY_RES[1]
+    for text in samples + ['a' * 5000, 'Acme ' * 1000 + 'LLC']:
+        expected = unanchored.search(text)
+        actual = anchored.search(text)
+        assert (actual and actual.group(1)) == (expected and expected.group(1))
+
+
+def test_excel_streaming_matches_pandas_and_csv(tmp_path):
+    """Test streamed .xlsx rows parse like the pandas read and the same data as CSV"""
+    import csv
+    from openpyxl import Workbook
+    from parser.excel_parser import ExcelParser, _frame_rows, _read_excel_frame, _read_excel_rows
+    
+    csv_file = Path(__file__).parent.parent / 'parser' / 'brokers.csv'
+    xlsx_file = tmp_path / 'brokers.xlsx'
+    workbook = Workbook()
+    with open(csv_file, 'r', encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            workbook.active.append(row)
+    workbook.save(xlsx_file)
+    
+    streamed = _without_timestamps(ExcelParser().parse_file(str(xlsx_file)).to_dict())
+    from_pandas = ExcelParser().parse_rows(_frame_rows(_read_excel_frame(str(xlsx_file))))
+    assert streamed == _without_timestamps(from_pandas.to_dict())
+    assert streamed == _without_timestamps(CSVParser().parse_file(str(csv_file)).to_dict())
+    
+    # Rows are only cached when asked for
+    _read_excel_rows.cache_clear()
+    ExcelParser().parse_file(str(xlsx_file))
+    assert _read_excel_rows.cache_info().currsize == 0
+    cached = ExcelParser(cache_rows=True)
+    cached.parse_file(str(xlsx_file))
+    assert _without_timestamps(cached.parse_file(str(xlsx_file)).to_dict()) == streamed
+    assert _read_excel_rows.cache_info().hits == 1
+    _read_excel_rows.cache_clear()
+    
+    with pytest.raises(ValueError):
+        ExcelParser().parse_file(str(tmp_path / 'missing.xlsx'))
+
+
+def test_parse_date_matches_strptime():
+    """Test the direct date builder agrees with the strptime formats it short-cuts"""
+    import random
+    from datetime import datetime
+    from parser.utils import parse_date, _TIME_RE
+    
+    formats = ['%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d', '%m-%d-%Y', '%B %d, %Y',
+               '%b %d, %Y', '%d %B %Y', '%d %b %Y', '%m/%d/%Y %I:%M %p']
+    
+    def strptime_date(date_str):
+        date_str = date_str.strip()
+        if ':' in date_str:
+            date_str = _TIME_RE.sub('', date_str)
+        date_str = date_str.split('\n')[0].strip()
+        for fmt in formats:
+            try:
+                return datetime.strptime(date_str, fmt)
+            except ValueError:
+                continue
+        return None
+    
+    rng = random.Random(0)
+    samples = ['02/30/2024', '13/01/2024', '1-5-24', '2024-02-30', 'Foo 12, 2024', 'Oct 28,2024',
+               'sept 3, 2024', '28 OCTOBER 2024', '10/28/2024 9:30 AM', '10/28/2024\n10/29/2024',
+               '١٠/٢٨/٢٠٢٤', '']
+    for _ in range(3000):
+        date = datetime(rng.randint(1, 9999), rng.randint(1, 12), rng.randint(1, 28))
+        text = date.strftime(rng.choice(formats))
+        if rng.random() < 0.3:
+            # Corrupt one character to exercise out-of-range and malformed input
+            i = rng.randrange(len(text))
+            text = text[:i] + rng.choice('0123456789/-, aZ') + text[i + 1:]
+        samples.append(text)
+    
+    for text in samples:
+        assert parse_date(text) == (strptime_date(text) if text else None), text
+
+
+def test_pdf_header_fields_only_searched_in_header(monkeypatch):
+    """Test broker and load ID fields come from the header window, lane and rate from anywhere"""
+    import random
+    import parser.pdf_parser as pdf_parser
+    from parser.pdf_parser import PDFParser, HEADER_SCAN_CHARS, _EMAIL_RE, _search_email
+    
+    header = "Broker: ABC Logistics LLC\nMC# 123456\nPhone: (555) 123-4567\nops@abc.com\nLoad #: L1\n"
+    footer = "Origin: Miami, FL\nDestination: Tampa, FL\nRate: $1,500.00\nPickup Date: 10/28/2024\n"
+    filler = "x" * HEADER_SCAN_CHARS
+    parser = PDFParser()
+    
+    data = parser._extract_data_from_text(header + filler + footer)
+    assert data['broker']['mc_id'] == '123456'
+    assert data['broker']['email'] == 'ops@abc.com'
+    assert data['load']['load_id'] == 'L1'
+    assert data['lane'] == {'origin': 'Miami, FL', 'destination': 'Tampa, FL'}
+    assert data['rate'] == {'amount': 1500.0}
+    
+    late = parser._extract_data_from_text(filler + header + footer)
+    assert late['broker'] == {}
+    assert 'load_id' not in late['load']
+    assert late['lane'] == data['lane']
+    
+    # Within the window the results match scanning the whole text
+    monkeypatch.setattr(pdf_parser, 'HEADER_SCAN_CHARS', len(filler) * 4)
+    assert parser._extract_data_from_text(header + filler + footer) == data
+    
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice('ab.@_-+ \n%1') for _ in range(rng.randint(0, 30)))
+        expected = _EMAIL_RE.search(text)
+        actual = _search_email(text)
+        assert (actual and actual.span()) == (expected and expected.span()), text
+
+
+def test_job_queue_status_transitions():
+    """Test jobs move queued → started → finished/failed and expire after result_ttl"""
+    import threading
+    import time
+    from jobs import JobQueue
+    
+    queue = JobQueue(max_workers=1, result_ttl=3600)
+    started = threading.Event()
+    release = threading.Event()
+    
+    def blocked():
+        started.set()
+        release.wait(5)
+        return {'ok': True}
+    
+    def failing():
+        raise RuntimeError("boom")
+    
+    first = queue.enqueue(blocked, meta={'carrier_id': 'c1'})
+    assert started.wait(5)
+    second = queue.enqueue(failing, job_id='job-2')
+    assert second == 'job-2'
+    assert queue.get(first)['status'] == 'started'
+    assert queue.get(second)['status'] == 'queued'
+    assert queue.find(carrier_id='c1')['job_id'] == first
+    
+    release.set()
+    queue.executor.shutdown(wait=True)
+    job = queue.get(first)
+    assert job['status'] == 'finished'
+    assert job['result'] == {'ok': True}
+    assert job['started_at'] <= job['ended_at']
+    job = queue.get(second)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'boom'
+    assert queue.get('unknown') is None
+    
+    # Completed jobs are pruned once they outlive result_ttl
+    queue = JobQueue(max_workers=1, result_ttl=0)
+    done = queue.enqueue(lambda: None)
+    while queue.get(done)['status'] != 'finished':
+        time.sleep(0.01)
+    time.sleep(0.01)
+    queue.enqueue(lambda: None)  # Enqueueing prunes expired jobs
+    queue.executor.shutdown(wait=True)
+    assert queue.get(done) is None
+
+
+@pytest.fixture(params=['streaming', 'buffered'])
+def api_client(request, tmp_path, monkeypatch):
+    """Flask test client with uploads staged under tmp_path and onboarding stubbed out"""
+    import api
+    from jobs import JobQueue
+    
+    if request.param == 'buffered':
+        monkeypatch.setattr(api, 'StreamingFormDataParser', None)
+    elif api.StreamingFormDataParser is None:
+        pytest.skip("streaming-form-data is not installed")
+    
+    def run_onboarding(file_paths, staging_dir, carrier_id, carrier_name=None, carrier_mc=None):
+        with open(file_paths[0], encoding='utf-8') as file:
+            content = file.read()
+        return {'files': [os.path.basename(path) for path in file_paths], 'content': content,
+                'carrier_id': carrier_id, 'carrier_name': carrier_name}
+    
+    monkeypatch.setitem(api.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(api, 'onboarding_jobs', JobQueue(max_workers=1))
+    monkeypatch.setattr(api, 'run_onboarding', run_onboarding)
+    return api.app.test_client()
+
+
+def test_onboard_upload_rejects_bad_requests(api_client, tmp_path):
+    """Test uploads without files or with a disallowed type get a 400 and leave nothing staged"""
+    import io
+    
+    response = api_client.post('/api/v1/onboard', data={'carrier_name': 'Acme'},
+                               content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'No files provided'}
+    
+    response = api_client.post('/api/v1/onboard', data={'files': (io.BytesIO(b'data'), 'notes.txt')},
+                               content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid file type: notes.txt'}
+    
+    # No boundary, and a body that isn't multipart at all
+    response = api_client.post('/api/v1/onboard', data=b'--x\r\n', content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    response = api_client.post('/api/v1/onboard', data=b'garbage\r\n--abc\r\nno headers\r\n\r\n' * 3,
+                               content_type='multipart/form-data; boundary=abc')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_onboard_upload_queues_job(api_client):
+    """Test an upload returns 202 with a job that /api/v1/jobs/<id> reports on"""
+    import io
+    import api
+    
+    response = api_client.post(
+        '/api/v1/onboard',
+        data={'files': (io.BytesIO(b'Broker,MC#\nABC,123456\n'), 'loads.csv'), 'carrier_name': 'Acme'},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['status'] == 'queued'
+    assert response.headers['Location'] == f"/api/v1/jobs/{body['job_id']}"
+    
+    api.onboarding_jobs.executor.shutdown(wait=True)
+    response = api_client.get(response.headers['Location'])
+    assert response.status_code == 200
+    job = response.get_json()
+    assert job['status'] == 'finished'
+    assert job['carrier_id'] == body['carrier_id']
+    assert job['result'] == {'files': ['loads.csv'], 'content': 'Broker,MC#\nABC,123456\n',
+                             'carrier_id': body['carrier_id'], 'carrier_name': 'Acme'}
+    
+    response = api_client.get('/api/v1/jobs/unknown')
+    assert response.status_code == 404